@@ -9,13 +9,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import itertools
 import json
 import os
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict, Any, Iterator
+from collections import deque
+from typing import List, Dict, Any, AsyncIterator, Deque, Iterator, Optional
 
-from openai import OpenAI
+import semantic_cache
+from openai_client import async_client, client
+
+try:
+    import orjson  # optional: much faster (de)serialization on the Pi
+except ImportError:
+    orjson = None
 
 # ---------- PATHS & CONFIG ----------
 
@@ -23,6 +33,9 @@ ROOT_DIR = Path(__file__).resolve().parent
 PROMPT_FILE = ROOT_DIR / "cade_system_prompt.txt"
 MEMORY_FILE = ROOT_DIR / "cade_memory.json"
 
+# Pretty-print cade_memory.json only when debugging (compact = half the flash writes)
+DEBUG = os.environ.get("CADE_DEBUG") == "1"
+
 # Models
 CHAT_MODEL = "gpt-4.1-mini"       # main conversation model
 SUMMARIZER_MODEL = "gpt-4.1-mini" # can be same or smaller
@@ -31,27 +44,107 @@ SUMMARIZER_MODEL = "gpt-4.1-mini" # can be same or smaller
 MAX_HISTORY_MESSAGES = 24   # per session (not counting system)
 MAX_MEMORY_ITEMS = 60       # total long-term memory chunks
 TARGET_MEMORY_ITEMS = 40    # after pruning/summarizing, aim for about this many
+PROMPT_MEMORY_ITEMS = 20    # most recent memories injected into each new session
+
+# Reuse replies to near-identical first requests (see semantic_cache.py)
+SEMANTIC_CACHE_ENABLED = os.environ.get("CADE_SEMANTIC_CACHE", "1") == "1"
+
+# Sessions smaller than this skip memory extraction (no summarizer call)
+MIN_MEMORY_USER_TURNS = 2
+MIN_MEMORY_DIALOG_CHARS = 200
 
 # ---------- OPENAI CLIENT ----------
 
-# Uses OPENAI_API_KEY from environment.
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+# `client` and `async_client` are the shared pooled clients from openai_client.py
+
+
+def _warm_up_connection() -> None:
+    """Cheap authenticated request that opens the TLS session before the first wake."""
+    try:
+        client.models.retrieve(CHAT_MODEL)
+        print("[ai_backend] OpenAI connection warmed up.")
+    except Exception as e:
+        print(f"[ai_backend] Connection warmup failed: {e}")
+
+
+threading.Thread(target=_warm_up_connection, daemon=True).start()
 
 
 # ---------- TYPES ----------
 
 Message = Dict[str, str]           # {"role": "system"/"user"/"assistant", "content": str}
-History = List[Message]
 MemoryItem = Dict[str, Any]        # {"text": str, "created_at": float, "source": str, "importance": int}
 
 
+class History:
+    """
+    Per-session chat history: a pinned system message plus a bounded deque of
+    user/assistant turns. Appending past MAX_HISTORY_MESSAGES evicts the
+    oldest turn in O(1); the system message is never dropped.
+
+    Iterates (and indexes) like the flat message list the API expects.
+    """
+
+    __slots__ = ("system", "turns")
+
+    def __init__(self, system: Message):
+        self.system = system
+        self.turns: Deque[Message] = deque(maxlen=MAX_HISTORY_MESSAGES)
+
+    def append(self, message: Message) -> None:
+        self.turns.append(message)
+
+    def messages(self) -> List[Message]:
+        """Flat list for `messages=` in API calls."""
+        return [self.system, *self.turns]
+
+    def __iter__(self) -> Iterator[Message]:
+        yield self.system
+        yield from self.turns
+
+    def __reversed__(self) -> Iterator[Message]:
+        yield from reversed(self.turns)
+        yield self.system
+
+    def __len__(self) -> int:
+        return 1 + len(self.turns)
+
+    def __getitem__(self, index):
+        if index == 0:
+            return self.system
+        return self.messages()[index]
+
+
+# ---------- IN-PROCESS FILE CACHES ----------
+
+# Keyed on st_mtime_ns so repeated wakes hit RAM instead of the SD card.
+_prompt_cache: Dict[str, Any] = {"mtime": None, "text": None}
+_memory_cache: Dict[str, Any] = {"mtime": None, "data": None, "bullets_text": None}
+
+# Memory is updated from a background thread after each session, so the cache
+# and file are guarded; _memory_update_lock serializes whole updates.
+_memory_lock = threading.RLock()
+_memory_update_lock = threading.Lock()
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 # ---------- SYSTEM PROMPT LOADING ----------
 
 def _load_system_prompt() -> str:
-    if PROMPT_FILE.exists():
-        return PROMPT_FILE.read_text(encoding="utf-8").strip()
+    mtime = _mtime_ns(PROMPT_FILE)
+    if mtime is not None:
+        if _prompt_cache["mtime"] == mtime:
+            return _prompt_cache["text"]
+        text = PROMPT_FILE.read_text(encoding="utf-8").strip()
+        _prompt_cache["mtime"] = mtime
+        _prompt_cache["text"] = text
+        return text
     # Fallback default if file missing
     return (
         "You are K4D3 (“Cade”), a friendly, concise voice assistant. "
@@ -61,27 +154,71 @@ def _load_system_prompt() -> str:
 
 # ---------- LONG-TERM MEMORY STORAGE ----------
 
-def _load_memory() -> List[MemoryItem]:
-    if not MEMORY_FILE.exists():
-        return []
+def _memory_as_bullets(memories: List[MemoryItem]) -> str:
+    if not memories:
+        return "No prior memories."
+    lines = [f"- {m['text']}" for m in memories]
+    return "\n".join(lines)
+
+
+def _set_memory_cache(mtime: Optional[int], data: List[MemoryItem]) -> None:
+    """Store parsed memories plus the prompt bullets built from them."""
+    # Keep only the most recent N memories for the system prompt
+    memories_sorted = sorted(data, key=lambda m: m.get("created_at", 0), reverse=True)
+    _memory_cache["mtime"] = mtime
+    _memory_cache["data"] = data
+    _memory_cache["bullets_text"] = _memory_as_bullets(memories_sorted[:PROMPT_MEMORY_ITEMS])
+
+
+def _refresh_memory_cache() -> None:
+    mtime = _mtime_ns(MEMORY_FILE)
+    if mtime is None:
+        if _memory_cache["mtime"] is not None or _memory_cache["data"] is None:
+            _set_memory_cache(None, [])
+        return
+    if _memory_cache["mtime"] == mtime:
+        return
+
+    data: List[MemoryItem] = []
     try:
-        data = json.loads(MEMORY_FILE.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            return data
+        raw = MEMORY_FILE.read_bytes()
+        parsed = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        if isinstance(parsed, list):
+            data = parsed
     except Exception:
         pass
-    return []
+    _set_memory_cache(mtime, data)
 
 
-def _save_memory(memories: List[MemoryItem]) -> None:
-    MEMORY_FILE.write_text(json.dumps(memories, indent=2), encoding="utf-8")
+def _load_memory() -> List[MemoryItem]:
+    with _memory_lock:
+        _refresh_memory_cache()
+        # Hand out a copy so callers can append without touching the cache
+        return list(_memory_cache["data"])
 
 
-def _memory_as_bullets(memories: List[MemoryItem]) -> str:
-    if not memories:
-        return "No prior memories."
-    lines = [f"- {m['text']}" for m in memories]
-    return "\n".join(lines)
+def _load_memory_bullets() -> str:
+    with _memory_lock:
+        _refresh_memory_cache()
+        return _memory_cache["bullets_text"]
+
+
+def _save_memory(memories: List[MemoryItem]) -> None:
+    """Write memories to a temp file and atomically swap it into place."""
+    if orjson is not None:
+        payload = orjson.dumps(memories, option=orjson.OPT_INDENT_2 if DEBUG else 0)
+    else:
+        payload = json.dumps(
+            memories,
+            indent=2 if DEBUG else None,
+            separators=None if DEBUG else (",", ":"),
+        ).encode("utf-8")
+
+    with _memory_lock:
+        tmp_path = MEMORY_FILE.with_suffix(".json.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, MEMORY_FILE)
+        _set_memory_cache(MEMORY_FILE.stat().st_mtime_ns, list(memories))
 
 
 # ---------- HISTORY CONSTRUCTION ----------
@@ -91,17 +228,11 @@ def new_history() -> History:
     Create a fresh history for a new ACTIVE session.
 
     - Loads the base system prompt
-    - Loads long-term memory items from disk
+    - Loads long-term memory bullets (cached per memory-file version)
     - Injects them into a single system message
     """
     base_prompt = _load_system_prompt()
-    memories = _load_memory()
-
-    # Keep only the most recent N memories
-    memories_sorted = sorted(memories, key=lambda m: m.get("created_at", 0), reverse=True)
-    recent_memories = memories_sorted[:20]  # you can tweak this
-
-    memory_text = _memory_as_bullets(recent_memories)
+    memory_text = _load_memory_bullets()
 
     system_content = (
         f"{base_prompt}\n\n"
@@ -111,28 +242,25 @@ def new_history() -> History:
         f"{memory_text}"
     )
 
-    history: History = [
-        {"role": "system", "content": system_content}
-    ]
-    return history
+    return History({"role": "system", "content": system_content})
 
 
-# ---------- HISTORY TRIMMING ----------
+# ---------- SEMANTIC REPLY CACHE ----------
+
+def _cache_eligible(history: History, user_text: str) -> bool:
+    """Only the first, context-free turn of a session may use the reply cache."""
+    return SEMANTIC_CACHE_ENABLED and len(history) == 1 and semantic_cache.is_cacheable(user_text)
 
-def _trim_history_inplace(history: History) -> None:
-    """
-    Keep the system message + last N user/assistant messages.
-    Mutates the history list in place.
-    """
-    if len(history) <= MAX_HISTORY_MESSAGES + 1:
-        return
 
-    system_msg = history[0]
-    tail = history[1:]
-    tail = tail[-MAX_HISTORY_MESSAGES:]
-    history.clear()
-    history.append(system_msg)
-    history.extend(tail)
+def _cache_reply(user_text: str, reply: str) -> None:
+    # MODE:ACT frames trigger fresh tool calls; never replay them
+    if reply.lstrip().upper().startswith("MODE:CHAT"):
+        semantic_cache.store(user_text, reply)
+
+
+def _replay_cached(history: History, user_text: str, reply: str) -> None:
+    history.append({"role": "user", "content": user_text})
+    history.append({"role": "assistant", "content": reply})
 
 
 # ---------- MAIN CHAT COMPLETION ----------
@@ -145,16 +273,24 @@ def generate_response(history: History, user_text: str) -> str:
     if not user_text:
         return ""
 
+    use_cache = _cache_eligible(history, user_text)
+    if use_cache:
+        cached = semantic_cache.lookup(user_text)
+        if cached is not None:
+            _replay_cached(history, user_text, cached)
+            return cached
+
     history.append({"role": "user", "content": user_text})
-    _trim_history_inplace(history)
 
     response = client.chat.completions.create(
         model=CHAT_MODEL,
-        messages=history,
+        messages=history.messages(),
     )
 
     reply = response.choices[0].message.content or ""
     history.append({"role": "assistant", "content": reply})
+    if use_cache:
+        _cache_reply(user_text, reply)
     return reply
 
 def generate_response_streaming(history: History, user_text: str) -> Iterator[str]:
@@ -179,41 +315,111 @@ def generate_response_streaming(history: History, user_text: str) -> Iterator[st
         return
         yield  # makes this a generator even if we early-return
 
-    # Add the new user message
+    use_cache = _cache_eligible(history, user_text)
+    if use_cache:
+        cached = semantic_cache.lookup(user_text)
+        if cached is not None:
+            _replay_cached(history, user_text, cached)
+            yield cached
+            return
+
+    # Add the new user message (the deque drops the oldest turn if full)
     history.append({"role": "user", "content": user_text})
-    _trim_history_inplace(history)
 
     # Call OpenAI with streaming enabled
     stream = client.chat.completions.create(
         model=CHAT_MODEL,
-        messages=history,
+        messages=history.messages(),
         stream=True,
     )
 
     full_reply_parts: List[str] = []
+    append = full_reply_parts.append
 
     for chunk in stream:
-        # Each chunk contains a delta with optional content
-        choice = chunk.choices[0]
-        delta = choice.delta
-
-        # In the new OpenAI python client, delta.content is usually a string (or None)
-        token = getattr(delta, "content", None)
-        if not token:
+        try:
+            token = chunk.choices[0].delta.content
+        except (AttributeError, IndexError):
+            # e.g. a trailing usage-only chunk with no choices
             continue
-
-        full_reply_parts.append(token)
-        # Yield this token to the caller (cade_brain) immediately
-        yield token
+        if token:
+            append(token)
+            # Yield this token to the caller (cade_brain) immediately
+            yield token
 
     # After streaming is done, join everything and append to history
     full_reply = "".join(full_reply_parts).strip()
     if full_reply:
         history.append({"role": "assistant", "content": full_reply})
+        if use_cache:
+            _cache_reply(user_text, full_reply)
+
+
+async def generate_response_streaming_async(history: History, user_text: str) -> AsyncIterator[str]:
+    """
+    asyncio version of generate_response_streaming (same history handling),
+    using async_client so waiting on the network doesn't tie up a thread.
+    """
+    if not user_text:
+        return
+
+    use_cache = _cache_eligible(history, user_text)
+    if use_cache:
+        cached = await asyncio.to_thread(semantic_cache.lookup, user_text)
+        if cached is not None:
+            _replay_cached(history, user_text, cached)
+            yield cached
+            return
+
+    history.append({"role": "user", "content": user_text})
+
+    stream = await async_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=history.messages(),
+        stream=True,
+    )
+
+    full_reply_parts: List[str] = []
+    append = full_reply_parts.append
+
+    async for chunk in stream:
+        try:
+            token = chunk.choices[0].delta.content
+        except (AttributeError, IndexError):
+            continue
+        if token:
+            append(token)
+            yield token
+
+    full_reply = "".join(full_reply_parts).strip()
+    if full_reply:
+        history.append({"role": "assistant", "content": full_reply})
+        if use_cache:
+            await asyncio.to_thread(_cache_reply, user_text, full_reply)
 
 
 # ---------- MEMORY EXTRACTION / PRUNING ----------
 
+_ROLE_PREFIX = {"user": "User", "assistant": "Assistant", "system": "System"}
+
+
+def _json_items(raw: Optional[str]) -> List[str]:
+    """
+    Pull the non-empty strings out of a JSON-mode reply shaped like
+    {"items": [...]}. JSON mode asks for a JSON object, but a reply cut off
+    at max_tokens is still invalid, so that just yields no items.
+    """
+    try:
+        data = orjson.loads(raw or "{}") if orjson is not None else json.loads(raw or "{}")
+    except ValueError as e:   # orjson.JSONDecodeError subclasses it too
+        print(f"[ai_backend] Ignoring invalid JSON reply: {e}")
+        return []
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return []
+    return [text for text in (str(x).strip() for x in items) if text]
+
+
 def extract_memories_from_history(history: History, max_new: int = 5) -> List[str]:
     """
     Ask the model to extract important, reusable "memories" from the conversation.
@@ -222,9 +428,6 @@ def extract_memories_from_history(history: History, max_new: int = 5) -> List[st
       - "User lives in Anytown, California."
       - "User prefers responses in Japanese."
     """
-    # Don’t include the initial system message, just the dialog
-    dialog = history[1:]
-
     # Build a prompt for summarization / memory extraction
     system = (
         "You are a memory extraction module for a voice assistant.\n"
@@ -232,19 +435,18 @@ def extract_memories_from_history(history: History, max_new: int = 5) -> List[st
         "about the user or ongoing long-term projects.\n"
         "Only include items that would be useful in future conversations (e.g., preferences, "
         "personality, stable facts). Skip small talk and fleeting details.\n"
-        f"Return ONLY a JSON list of strings, no extra text.\n"
-        f"Limit to at most {max_new} items."
+        'Return a JSON object of the form {"items": ["...", "..."]}.\n'
+        f"Limit to at most {max_new} items; use an empty list if nothing is worth keeping."
     )
 
-    # Flatten dialog messages into one plain-text transcript
-    lines = []
-    for m in dialog:
-        role = m["role"]
-        prefix = "User" if role == "user" else "Assistant" if role == "assistant" else "System"
-        lines.append(f"{prefix}: {m['content']}")
-    transcript = "\n".join(lines)
+    # Flatten the dialog into one plain-text transcript, skipping the initial
+    # system message
+    transcript = "\n".join(
+        f"{_ROLE_PREFIX.get(m['role'], 'System')}: {m['content']}"
+        for m in itertools.islice(history, 1, None)
+    )
 
-    messages: History = [
+    messages: List[Message] = [
         {"role": "system", "content": system},
         {"role": "user", "content": transcript},
     ]
@@ -253,51 +455,53 @@ def extract_memories_from_history(history: History, max_new: int = 5) -> List[st
         model=SUMMARIZER_MODEL,
         messages=messages,
         temperature=0.2,
+        response_format={"type": "json_object"},
     )
 
-    raw = resp.choices[0].message.content or "[]"
-
-    try:
-        memories = json.loads(raw)
-        if isinstance(memories, list):
-            return [str(x).strip() for x in memories if str(x).strip()]
-    except Exception:
-        # If the model didn't follow instructions, just bail quietly
-        pass
-
-    return []
+    return _json_items(resp.choices[0].message.content)
 
 
 def update_long_term_memory_from_history(history: History, source: str = "conversation") -> None:
     """
     Call this *after* a session ends (e.g., when Cade hears 'shut down').
+    Safe to run on a background thread; concurrent updates are serialized.
 
     - Extracts a few new memories from the history
     - Appends them to cade_memory.json with metadata
     - If memory gets too large, asks the model to summarize/prune
-    """
-    existing = _load_memory()
-    new_memory_texts = extract_memories_from_history(history)
 
-    if not new_memory_texts:
+    Trivial sessions ("hey cade" / "goodbye") return early without an LLM call.
+    """
+    dialog = list(itertools.islice(history, 1, None))
+    user_turns = sum(1 for m in dialog if m["role"] == "user")
+    total_chars = sum(len(m["content"]) for m in dialog)
+    if user_turns < MIN_MEMORY_USER_TURNS or total_chars < MIN_MEMORY_DIALOG_CHARS:
+        print(f"[memory] Skipping extraction ({user_turns} user turns, {total_chars} chars).")
         return
 
-    now = time.time()
-    for text in new_memory_texts:
-        existing.append(
-            {
-                "text": text,
-                "created_at": now,
-                "source": source,
-                "importance": 1,  # simple placeholder; could be scored later
-            }
-        )
+    with _memory_update_lock:
+        new_memory_texts = extract_memories_from_history(history)
+
+        if not new_memory_texts:
+            return
+
+        existing = _load_memory()
+        now = time.time()
+        for text in new_memory_texts:
+            existing.append(
+                {
+                    "text": text,
+                    "created_at": now,
+                    "source": source,
+                    "importance": 1,  # simple placeholder; could be scored later
+                }
+            )
 
-    # If we exceed the max, prune/summarize
-    if len(existing) > MAX_MEMORY_ITEMS:
-        existing = _prune_and_summarize_memories(existing)
+        # If we exceed the max, prune/summarize
+        if len(existing) > MAX_MEMORY_ITEMS:
+            existing = _prune_and_summarize_memories(existing)
 
-    _save_memory(existing)
+        _save_memory(existing)
 
 
 def _prune_and_summarize_memories(memories: List[MemoryItem]) -> List[MemoryItem]:
@@ -311,16 +515,17 @@ def _prune_and_summarize_memories(memories: List[MemoryItem]) -> List[MemoryItem
 
     system = (
         "You are a memory compression module for a voice assistant.\n"
-        "You receive a list of many memory bullet points about the user.\n"
+        "You receive a newline-separated list of many memory bullet points about the user.\n"
         "Some may be redundant or overly specific.\n"
         f"Condense and merge them into at most {TARGET_MEMORY_ITEMS} bullet points that preserve "
         "all important long-term facts and preferences.\n"
-        "Return ONLY a JSON list of strings, no extra commentary."
+        'Return a JSON object of the form {"items": ["...", "..."]}.'
     )
 
-    user_content = json.dumps(memory_texts, ensure_ascii=False, indent=2)
+    # Plain bullets: the model doesn't need JSON input, and it costs fewer tokens
+    user_content = "\n".join(f"- {t}" for t in memory_texts)
 
-    messages: History = [
+    messages: List[Message] = [
         {"role": "system", "content": system},
         {"role": "user", "content": user_content},
     ]
@@ -329,32 +534,22 @@ def _prune_and_summarize_memories(memories: List[MemoryItem]) -> List[MemoryItem
         model=SUMMARIZER_MODEL,
         messages=messages,
         temperature=0.2,
+        response_format={"type": "json_object"},
     )
 
-    raw = resp.choices[0].message.content or "[]"
-
-    try:
-        compressed = json.loads(raw)
-        if not isinstance(compressed, list):
-            raise ValueError("Not a list")
-
-        now = time.time()
-        new_memories: List[MemoryItem] = []
-        for text in compressed:
-            text = str(text).strip()
-            if not text:
-                continue
-            new_memories.append(
-                {
-                    "text": text,
-                    "created_at": now,
-                    "source": "summary",
-                    "importance": 1,
-                }
-            )
-        return new_memories
-    except Exception:
-        # If summarization fails, fall back to the most recent items
+    compressed = _json_items(resp.choices[0].message.content)
+    if not compressed:
+        # Never let an empty summary wipe the store; keep the most recent items
         memories_sorted = sorted(memories, key=lambda m: m.get("created_at", 0), reverse=True)
         return memories_sorted[:TARGET_MEMORY_ITEMS]
 
+    now = time.time()
+    return [
+        {
+            "text": text,
+            "created_at": now,
+            "source": "summary",
+            "importance": 1,
+        }
+        for text in compressed
+    ]
@@ -15,6 +15,13 @@ which:
 - waits for you to start talking
 - stops after trailing silence
 - returns one utterance as text
+
+While Cade is replying, the next utterance is already being captured in the
+background (respond_and_listen); talking over Cade stops its playback.
+
+The loop runs on one asyncio event loop (cade_loop_async): model replies
+stream through AsyncOpenAI, and the blocking mic / TTS / camera calls run
+via asyncio.to_thread.
 """
 from __future__ import annotations
 
@@ -22,32 +29,68 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+import asyncio
+import hashlib
 import re
-from typing import List, Dict
+import string
+import time
+from functools import lru_cache
+from typing import List, Dict, NamedTuple
 from vision_backend import describe_scene
 from voice_recognizer import listen_and_transcribe_auto
-from ai_backend import new_history, generate_response, generate_response_streaming
-
-from tts_backend import speak
-import subprocess
+from ai_backend import (
+    new_history,
+    generate_response,
+    generate_response_streaming,
+    generate_response_streaming_async,
+    update_long_term_memory_from_history,
+)
+
+from tts_backend import (
+    speak, stop_speaking, play_wav_file, preload_tts, clear_barge_in, barge_in_requested,
+    SENTENCE_MIN_CHARS,
+)
 import os
 import shutil
 import random
 import socket
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from eye_engine import DroidEye   # ?? add this
 
+try:
+    import ahocorasick  # optional: pyahocorasick, one pass over all phrases
+except ImportError:
+    ahocorasick = None
+
+try:
+    import xxhash  # optional: faster CHECK_CODE content hashing
+except ImportError:
+    xxhash = None
+
+# The LAN IP practically never changes; don't open a socket for every ask
+IP_CACHE_SECONDS = 60.0
+_ip_cache = {"ts": 0.0, "ip": None}
+
+
 def get_internal_ip():
-    """Return the Pi's internal LAN IP address."""
+    """Return the Pi's internal LAN IP address (cached for IP_CACHE_SECONDS)."""
+    now = time.monotonic()
+    if _ip_cache["ip"] is not None and now - _ip_cache["ts"] < IP_CACHE_SECONDS:
+        return _ip_cache["ip"]
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         # Doesn't need to be reachable — just forces OS to pick the right adapter
         s.connect(("8.8.8.8", 80))
         ip = s.getsockname()[0]
         s.close()
-        return ip
     except Exception:
         return "Unknown"
+    _ip_cache["ts"] = now
+    _ip_cache["ip"] = ip
+    return ip
 
 
 # --------- CONFIG: wake words & shutdown phrases ---------
@@ -81,6 +124,15 @@ SHUTDOWN_PHRASES = [
     "bye kade",
     "see you later"
 ]
+# Questions answered locally (no LLM call): "what's your IP", "your local ip", ...
+IP_PHRASES = [
+    "your internal ip",
+    "your local ip",
+    "your ip",
+    "your ip address",
+    "what's your ip",
+]
+
 THINKING_PHRASES = [
     "Hmm...",
     ""
@@ -95,33 +147,45 @@ def quick_thinking_ack(eye=None):
 #        eye.thinking(cycles=3)
 #    speak(phrase)
 
+# Resolved once at import instead of walking PATH on every sound
+_APLAY = shutil.which("aplay")
+
+
 def play_sound(path: str) -> None:
     """
     Play a WAV file using aplay (most reliable on Raspberry Pi).
     aplay does NOT support MP3, so file must be .wav.
     """
-    # Confirm file exists
-    if not os.path.exists(path):
-        print(f"[play_sound] File not found: {path}")
-        return
-
-    # Confirm aplay is installed
-    if not shutil.which("aplay"):
+    # A missing file is reported by the player itself
+    if _APLAY is None:
         print("[play_sound] 'aplay' not found. Install with: sudo apt install alsa-utils")
         return
 
     try:
-        subprocess.Popen(
-            ["aplay", "-q", path],   # -q makes it quiet (no ALSA spam)
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
+        # Fed through tts_backend's persistent aplay; the write blocks while
+        # the sound plays, so do it off the calling thread.
+        threading.Thread(target=play_wav_file, args=(path,), kwargs={"wait": False}, daemon=True).start()
         print(f"[play_sound] Playing {path} with aplay")
     except Exception as e:
         print(f"[play_sound] Failed to play {path}: {e}")
 
 # --------- TEXT NORMALIZATION HELPERS ---------
 
+class _NormTable(dict):
+    """str.translate table: a-z/0-9 kept, A-Z lowered, anything else -> space."""
+
+    def __missing__(self, codepoint: int) -> str:
+        self[codepoint] = " "
+        return " "
+
+
+_NORM_TABLE = _NormTable(
+    {ord(c): c for c in string.ascii_lowercase + string.digits}
+    | {ord(c): c.lower() for c in string.ascii_uppercase}
+)
+
+
+@lru_cache(maxsize=256)
 def normalize(text: str) -> str:
     """
     Normalize text for matching:
@@ -129,10 +193,98 @@ def normalize(text: str) -> str:
     - strip non alphanumerics to spaces
     - collapse multiple spaces
     """
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    # One translate pass; split()/join collapses and trims the whitespace
+    return " ".join(text.translate(_NORM_TABLE).split())
+
+
+def _normalize_phrases(phrases) -> tuple[str, ...]:
+    """Normalize a constant phrase list once: deduped, no empties, longest first."""
+    normed = {normalize(p) for p in phrases} - {""}
+    return tuple(sorted(normed, key=lambda p: (-len(p), p)))
+
+
+# WAKE_WORDS / SHUTDOWN_PHRASES are constants, so normalize them exactly once
+_WAKE_NORMED = _normalize_phrases(WAKE_WORDS)
+_SHUTDOWN_NORMED = _normalize_phrases(SHUTDOWN_PHRASES)
+_IP_NORMED = _normalize_phrases(IP_PHRASES)
+
+
+def _alternation(normed: tuple[str, ...]) -> str:
+    """Escaped phrases joined (in the given order) into one regex alternation."""
+    return "|".join(map(re.escape, normed))
+
+
+# Built once at import: a wake word must be a whole word (or words) of the
+# normalized utterance; shutdown phrases match anywhere, as before.
+_WAKE_RE = re.compile(r"(?:^|\s)(?:" + _alternation(_WAKE_NORMED) + r")(?=\s|$)")
+_SHUTDOWN_RE = re.compile(_alternation(_SHUTDOWN_NORMED))
+_IP_RE = re.compile(r"(?:^|\s)(?:" + _alternation(_IP_NORMED) + r")(?=\s|$)")
+
+
+def _build_phrase_automaton():
+    """
+    One Aho-Corasick automaton over every wake word, shutdown phrase and
+    local-intent phrase. Wake words and IP phrases are padded with spaces so
+    they only hit whole words of the space-padded utterance.
+    Returns None if pyahocorasick isn't installed.
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for ww in _WAKE_NORMED:
+        key = f" {ww} "
+        automaton.add_word(key, ("wake", len(key)))
+    for phrase in _SHUTDOWN_NORMED:
+        automaton.add_word(phrase, ("shutdown", len(phrase)))
+    for phrase in _IP_NORMED:
+        key = f" {phrase} "
+        automaton.add_word(key, ("ip", len(key)))
+    automaton.make_automaton()
+    return automaton
+
+
+_PHRASE_AUTOMATON = _build_phrase_automaton()
+
+
+class _PhraseHits(NamedTuple):
+    wake_end: int | None    # index in the normalized text just past the wake word
+    shutdown: bool
+    ip_query: bool
+
+
+@lru_cache(maxsize=256)
+def _scan_phrases(norm: str) -> _PhraseHits:
+    """
+    Classify a normalized utterance in a single sweep.
+
+    - wake_end: index in `norm` just past the leftmost (then longest) wake word,
+      or None if there is no wake word
+    - shutdown: True if any shutdown phrase occurs
+    - ip_query: True if the user is asking for Cade's IP address
+    """
+    if _PHRASE_AUTOMATON is None:
+        m = _WAKE_RE.search(norm)
+        return _PhraseHits(
+            m.end() if m else None,
+            _SHUTDOWN_RE.search(norm) is not None,
+            _IP_RE.search(norm) is not None,
+        )
+
+    wake_start = wake_end = None
+    shutdown = ip_query = False
+    for end_idx, (kind, length) in _PHRASE_AUTOMATON.iter(f" {norm} "):
+        if kind == "shutdown":
+            shutdown = True
+            continue
+        if kind == "ip":
+            ip_query = True
+            continue
+        start = end_idx - length + 1
+        if wake_start is None or start < wake_start or (start == wake_start and end_idx - 1 > wake_end):
+            # end_idx is the trailing pad space; in `norm` that is index end_idx - 1
+            wake_start, wake_end = start, end_idx - 1
+    return _PhraseHits(wake_end, shutdown, ip_query)
 
 
 def has_wake_word(text: str) -> bool:
@@ -146,29 +298,7 @@ def has_wake_word(text: str) -> bool:
     - "yo k4, what's up"
     all count.
     """
-    norm = normalize(text)
-    if not norm:
-        return False
-
-    padded = f" {norm} "
-    for ww in WAKE_WORDS:
-        ww_norm = normalize(ww)
-        if ww_norm == "":
-            continue
-
-        # exact match: "cade"
-        if norm == ww_norm:
-            return True
-
-        # at start: "cade what's the weather"
-        if norm.startswith(ww_norm + " "):
-            return True
-
-        # in middle: "hey cade what's up"
-        if f" {ww_norm} " in padded:
-            return True
-
-    return False
+    return _scan_phrases(normalize(text)).wake_end is not None
 
 def strip_wake_word(text: str) -> str:
     """
@@ -182,57 +312,195 @@ def strip_wake_word(text: str) -> str:
         "cade"                           -> ""
     """
     norm = normalize(text)
-    if not norm:
-        return ""
+    wake_end = _scan_phrases(norm).wake_end
+    if wake_end is None:
+        # no wake word found, just return normalized text
+        return norm
 
-    padded = f" {norm} "
+    # everything AFTER the wake word
+    return norm[wake_end:].strip()
 
-    for ww in WAKE_WORDS:
-        ww_norm = normalize(ww)
-        if not ww_norm:
-            continue
 
-        marker = f" {ww_norm} "
-        idx = padded.find(marker)
-        if idx != -1:
-            # everything AFTER the wake word
-            after = padded[idx + len(marker):].strip()
-            return after
+def is_shutdown(text: str) -> bool:
+    """
+    True if this utterance should end the ACTIVE session and return to IDLE.
+    """
+    return _scan_phrases(normalize(text)).shutdown
 
-    # no wake word found, just return normalized text
-    return norm
 
+def is_ip_query(text: str) -> bool:
+    """
+    True if the user is asking for Cade's IP address; answered locally
+    without calling the model.
+    """
+    return _scan_phrases(normalize(text)).ip_query
 
-def is_shutdown(text: str) -> bool:
+# --------- STREAMED TTS ---------
+
+# Once this many chars are buffered without a sentence end, speak up to the last space
+STREAM_TTS_MAX_CHARS = 80
+
+# Sentence end: punctuation (plus any closing quote/bracket) followed by whitespace
+_SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]]*\s")
+
+# A period after one of these doesn't end the sentence ("Mr. Smith", "e.g. this")
+_ABBREVIATIONS = frozenset({"mr", "mrs", "ms", "dr", "st", "jr", "sr", "vs", "e.g", "i.e"})
+
+# Single TTS worker so streamed chunks are spoken in order. Each chunk is
+# tagged with the speech epoch it belongs to; a barge-in bumps the epoch so
+# anything still queued from the interrupted reply is dropped.
+_tts_queue: "queue.Queue[tuple[int, str]]" = queue.Queue()
+_tts_thread: threading.Thread | None = None
+_speech_epoch = 0
+
+
+def _tts_worker() -> None:
+    while True:
+        epoch, text = _tts_queue.get()
+        try:
+            if epoch == _speech_epoch:
+                speak(text)
+        except Exception as e:
+            print(f"[tts-stream] speak failed: {e}")
+        finally:
+            _tts_queue.task_done()
+
+
+def _queue_speech(text: str, epoch: int) -> None:
+    global _tts_thread
+    if _tts_thread is None:
+        _tts_thread = threading.Thread(target=_tts_worker, daemon=True)
+        _tts_thread.start()
+    _tts_queue.put((epoch, text))
+
+
+def _cancel_speech() -> None:
+    """Barge-in: drop queued chunks and cut off the one playing."""
+    global _speech_epoch
+    _speech_epoch += 1
+    while True:
+        try:
+            _tts_queue.get_nowait()
+        except queue.Empty:
+            break
+        _tts_queue.task_done()
+    stop_speaking()
+
+
+def _split_speakable(buf: str) -> tuple[str, str]:
     """
-    True if this utterance should end the ACTIVE session and return to IDLE.
+    Split buffered reply text into (ready_to_speak, remainder).
+
+    Everything up to the last sentence end is ready, unless that is shorter
+    than SENTENCE_MIN_CHARS (it waits for more text, as speak() joins short
+    sentences too). Failing that, once the buffer passes STREAM_TTS_MAX_CHARS
+    we cut at the last space.
     """
-    norm = normalize(text)
-    if not norm:
-        return False
+    last = None
+    for m in _SENTENCE_END_RE.finditer(buf):
+        if m.group().startswith("."):
+            words = buf[:m.start()].split()
+            if words and words[-1].lstrip("\"'([").lower() in _ABBREVIATIONS:
+                continue
+        last = m
+    if last is not None and len(buf[:last.end()].strip()) >= SENTENCE_MIN_CHARS:
+        return buf[:last.end()], buf[last.end():]
+
+    if len(buf) >= STREAM_TTS_MAX_CHARS:
+        cut = buf.rfind(" ")
+        if cut > 0:
+            return buf[:cut], buf[cut:]
 
-    for phrase in SHUTDOWN_PHRASES:
-        phrase_norm = normalize(phrase)
-        if phrase_norm and phrase_norm in norm:
-            return True
+    return "", buf
 
-    return False
 
-def get_streamed_reply(history, user_text: str) -> str:
+class _ReplySpeaker:
     """
-    Convenience wrapper around generate_response_streaming:
-    - Iterates all chunks
-    - Concatenates them into one string
-    - Returns the full reply
+    Feeds streamed reply tokens to the TTS worker, sentence by sentence:
+    - Waits for the MODE header line
+    - For MODE:CHAT (or header-less) replies, queues each finished sentence
+      while generation continues
+    - MODE:ACT replies are never spoken
+    """
+
+    def __init__(self, eye: DroidEye | None):
+        self.eye = eye
+        self.full_reply = ""
+        self.spoken = False
+        self._speakable = None    # None until we know the reply mode
+        self._buf = ""
+        self._epoch = _speech_epoch
+
+    def _flush(self, text: str) -> None:
+        text = text.strip()
+        if not text:
+            return
+        if not self.spoken and self.eye:
+            self.eye.speaking()
+        _queue_speech(text, self._epoch)
+        self.spoken = True
+
+    def feed(self, chunk: str) -> None:
+        self.full_reply += chunk
+
+        if self._speakable is None:
+            head = self.full_reply.lstrip()
+            if "\n" not in head:
+                return
+            first, body = head.split("\n", 1)
+            first = first.strip().upper()
+            if first.startswith("MODE:CHAT"):
+                self._speakable, self._buf = True, body
+            elif first.startswith("MODE:"):
+                self._speakable = False
+            else:
+                # No header: parse_model_reply treats this as plain chat
+                self._speakable, self._buf = True, head
+        elif self._speakable:
+            self._buf += chunk
+        else:
+            return
+
+        if self._speakable:
+            ready, self._buf = _split_speakable(self._buf)
+            self._flush(ready)
+
+    def finish(self) -> None:
+        if self._speakable is None:
+            # Single-line reply: only speak it if it isn't a bare MODE header
+            head = self.full_reply.strip()
+            if not head.upper().startswith("MODE:"):
+                self._speakable, self._buf = True, head
 
-    Right now we still call TTS once on the full reply, but this sets you up to
-    later stream chunks into a streaming TTS backend instead of buffering.
+        if self._speakable:
+            self._flush(self._buf)
+            self._buf = ""
+
+
+def get_streamed_reply(history, user_text: str, eye: DroidEye | None = None) -> tuple[str, bool]:
     """
-    full_reply = ""
+    Wrapper around generate_response_streaming that speaks while it streams
+    (see _ReplySpeaker) and blocks until everything queued has been spoken.
+
+    Returns (full_reply, spoken). `spoken` is True when the chat text was
+    already voiced, so handle_model_reply must not speak it again.
+    """
+    speaker = _ReplySpeaker(eye)
     for chunk in generate_response_streaming(history, user_text):
-        full_reply += chunk
-        # In the future: send `chunk` to a streaming TTS engine here
-    return full_reply
+        speaker.feed(chunk)
+    speaker.finish()
+    _tts_queue.join()
+    return speaker.full_reply, speaker.spoken
+
+
+async def get_streamed_reply_async(history, user_text: str, eye: DroidEye | None = None) -> tuple[str, bool]:
+    """asyncio version of get_streamed_reply, used by the conversation loop."""
+    speaker = _ReplySpeaker(eye)
+    async for chunk in generate_response_streaming_async(history, user_text):
+        speaker.feed(chunk)
+    speaker.finish()
+    await asyncio.to_thread(_tts_queue.join)
+    return speaker.full_reply, speaker.spoken
 
 def parse_model_reply(content: str):
     """
@@ -289,11 +557,42 @@ def parse_model_reply(content: str):
     # Unknown mode -> treat as normal chat
     return "CHAT", None, None, content
     
-def handle_action(action: str | None,
-                  args: Dict | None,
-                  history,
-                  user_text: str,
-                  eye: DroidEye | None):
+# --------- CHECK_CODE FILE CACHE ---------
+
+# path -> (mtime_ns, text, digest), so repeat CHECK_CODEs skip the SD card
+_file_cache: Dict[str, tuple[int, str, str]] = {}
+
+# Which version of each file the model has already seen this session:
+# files maps path -> (digest, the history message that carried it)
+_shown_code: Dict = {"history": None, "files": {}}
+
+
+def _digest(text: str) -> str:
+    data = text.encode("utf-8", errors="ignore")
+    if xxhash is not None:
+        return xxhash.xxh64(data).hexdigest()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _read_code_cached(path: Path) -> tuple[str, str]:
+    """Return (text, digest) for `path`, re-reading only when its mtime changes."""
+    key = str(path.resolve())
+    mtime = path.stat().st_mtime_ns
+    cached = _file_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    digest = _digest(text)
+    _file_cache[key] = (mtime, text, digest)
+    return text, digest
+
+
+async def handle_action(action: str | None,
+                        args: Dict | None,
+                        history,
+                        user_text: str,
+                        eye: DroidEye | None):
     """
     Handle MODE:ACT frames.
 
@@ -313,18 +612,40 @@ def handle_action(action: str | None,
 
     if action_upper == "CHECK_CODE":
         file_path = args.get("file", "cade_brain.py")
+        if _shown_code["history"] is not history:
+            # New session: nothing has been shown to the model yet
+            _shown_code["history"] = history
+            _shown_code["files"] = {}
+
+        key = None
+        digest = None
+        already_shown = False
         try:
             path = Path(file_path)
             if not path.exists():
                 tool_result = f"[CHECK_CODE] File not found: {file_path}"
             else:
-                code = path.read_text(encoding="utf-8", errors="ignore")
-                # You could summarize or analyze locally here;
-                # for now we just forward the code back to the model.
-                tool_result = (
-                    f"Here is the current content of {file_path}:\n\n"
-                    f"{code}"
+                key = str(path.resolve())
+                code, digest = _read_code_cached(path)
+                shown = _shown_code["files"].get(key)
+                # Same version still in the (trimmed) history? Don't pay for it twice.
+                already_shown = (
+                    shown is not None
+                    and shown[0] == digest
+                    and any(m is shown[1] for m in history)
                 )
+                if already_shown:
+                    tool_result = (
+                        f"{file_path} has not changed since you read it earlier in "
+                        "this conversation; use that copy."
+                    )
+                else:
+                    # You could summarize or analyze locally here;
+                    # for now we just forward the code back to the model.
+                    tool_result = (
+                        f"Here is the current content of {file_path}:\n\n"
+                        f"{code}"
+                    )
         except Exception as e:
             tool_result = f"[CHECK_CODE] Error reading {file_path}: {e}"
 
@@ -335,15 +656,22 @@ def handle_action(action: str | None,
             f"The user originally said: {user_text}\n\n"
             "Now respond to the user in CHAT mode."
         )
-        if eye:
-            eye.thinking()
-        followup_reply = get_streamed_reply(history, followup_prompt)
+        _, (followup_reply, spoken) = await asyncio.gather(
+            eye.thinking_async() if eye else _noop_async(),
+            get_streamed_reply_async(history, followup_prompt, eye),
+        )
+        if key is not None and digest is not None and not already_shown:
+            # Remember the exact history message that carries this version
+            for m in reversed(history):
+                if m.get("role") == "user" and m.get("content") == followup_prompt:
+                    _shown_code["files"][key] = (digest, m)
+                    break
         print(f"Cade (follow-up): {followup_reply}")
-        handle_model_reply(history, user_text, followup_reply, eye)
+        await handle_model_reply(history, user_text, followup_reply, eye, spoken)
         return
     if action_upper == "SEE":
         try:
-            desc = describe_scene()
+            desc = await asyncio.to_thread(describe_scene)
             tool_result = f"The camera sees: {desc}"
         except Exception as e:
             tool_result = f"[SEE] Error using camera: {e}"
@@ -355,12 +683,12 @@ def handle_action(action: str | None,
             "Now respond to the user in CHAT mode, briefly."
         )
 
-    if eye:
-        eye.thinking()
-
-    followup_reply = get_streamed_reply(history, followup_prompt)
+    _, (followup_reply, spoken) = await asyncio.gather(
+        eye.thinking_async() if eye else _noop_async(),
+        get_streamed_reply_async(history, followup_prompt, eye),
+    )
     print(f"Cade (follow-up): {followup_reply}")
-    handle_model_reply(history, user_text, followup_reply, eye)
+    await handle_model_reply(history, user_text, followup_reply, eye, spoken)
     return
 
     # Unknown action: just tell the user we don't handle it yet.
@@ -368,37 +696,97 @@ def handle_action(action: str | None,
     print(f"[handle_action] Unknown action '{action}', falling back to chat.")
     if eye:
         eye.speaking()
-    speak(fallback)
+    await asyncio.to_thread(speak, fallback)
     
-def handle_model_reply(history,
-                       user_text: str,
-                       reply: str,
-                       eye: DroidEye | None):
+async def handle_model_reply(history,
+                             user_text: str,
+                             reply: str,
+                             eye: DroidEye | None,
+                             spoken: bool = False):
     """
     Central place to interpret the model reply and decide whether to:
-    - speak it (MODE:CHAT)
+    - speak it (MODE:CHAT), unless get_streamed_reply already did
     - run an internal action (MODE:ACT)
     """
     mode, action, args, chat_text = parse_model_reply(reply)
     print(f"[handle_model_reply] mode={mode}, action={action}, args={args}")
 
+    if barge_in_requested():
+        # The user talked over Cade; their next utterance is the next turn
+        print("[handle_model_reply] Barge-in this turn; dropping the rest of the reply.")
+        return
+
     if mode == "ACT":
         # Do NOT send anything to TTS yet; run the action pipeline instead
-        handle_action(action, args, history, user_text, eye)
+        await handle_action(action, args, history, user_text, eye)
         return
 
     # Default / MODE:CHAT
     text_to_speak = chat_text if chat_text is not None else reply
+    if spoken and text_to_speak:
+        print(f"Cade: {text_to_speak}")
+        return
+
     if not text_to_speak:
         text_to_speak = "I'm not sure what to say."
 
     print(f"Cade: {text_to_speak}")
     if eye:
         eye.speaking()
-    speak(text_to_speak)
+    await asyncio.to_thread(speak, text_to_speak)
+
+
+# --------- OVERLAPPED LISTENING (BARGE-IN) ---------
+
+# Set while Cade is working on / speaking a reply; the background listener
+# uses the higher barge-in threshold while it is set.
+_speaking = threading.Event()
+_listen_pool = ThreadPoolExecutor(max_workers=1)
+# Set to make the background listener give up (the turn failed)
+_listen_stop = threading.Event()
+
+
+async def respond_and_listen(history, user_text: str, eye: DroidEye | None) -> asyncio.Future:
+    """
+    Generate and speak the reply to `user_text` while the mic is already
+    listening for the next utterance. Talking over Cade stops the playback.
+
+    Returns a Future resolving to the next utterance's transcription.
+    """
+    clear_barge_in()
+    _listen_stop.clear()
+    _speaking.set()
+    next_utterance = asyncio.get_running_loop().run_in_executor(
+        _listen_pool, listen_and_transcribe_auto, _speaking, _cancel_speech, _listen_stop
+    )
+    try:
+        reply, spoken = await get_streamed_reply_async(history, user_text, eye)
+        if barge_in_requested():
+            print("[barge-in] Reply cut off; skipping the rest of this turn.")
+        else:
+            await handle_model_reply(history, user_text, reply, eye, spoken)
+    except BaseException:
+        # Don't leave the mic open (or speech playing) behind a failed turn
+        _cancel_speech()
+        _listen_stop.set()
+        await asyncio.gather(next_utterance, return_exceptions=True)
+        raise
+    finally:
+        _speaking.clear()
+    return next_utterance
+
+
 # --------- MAIN CONVERSATION LOOP ---------
 
-def cade_loop() -> None:
+def _noop() -> None:
+    pass
+
+
+async def _noop_async() -> None:
+    pass
+
+
+async def cade_loop_async() -> None:
     print("Cade is online. Say its name to wake it up.")
 
     # ?? Try to bring up the eye, but don't die if it fails
@@ -414,18 +802,35 @@ def cade_loop() -> None:
     else:
         print("[eye] DroidEye class not available; running headless.")
 
+    # Eye state calls, bound once; headless runs get no-ops. Wake and think
+    # are animations, awaited on this loop alongside the work they cover.
+    if eye:
+        eye_listen, eye_speak, eye_standby = eye.listening, eye.speaking, eye.standby
+        eye_wake, eye_think = eye.wake_flash_async, eye.thinking_async
+    else:
+        eye_listen = eye_speak = eye_standby = _noop
+        eye_wake = eye_think = _noop_async
+
     # ?? Play startup sound once on boot
     startup_sound = os.path.join(os.path.dirname(__file__), "windowsxpstartup.wav")
     print(f"[main] Startup sound path: {startup_sound}")
     play_sound(startup_sound)
 
+    # Synthesize the fixed lines (wake reply, standby, ...) while we idle
+    threading.Thread(target=preload_tts, daemon=True).start()
+
     while True:
         # -------- IDLE STATE --------
         print("\n[STATE] IDLE waiting for wake word...")
-        if eye:
-            eye.idle()
 
-        utterance = listen_and_transcribe_auto()
+        # The eye breathes on this loop while the mic thread records
+        breathing = asyncio.create_task(eye.breathe()) if eye else None
+        try:
+            utterance = await asyncio.to_thread(listen_and_transcribe_auto)
+        finally:
+            if breathing:
+                breathing.cancel()
+                await asyncio.gather(breathing, return_exceptions=True)
         if not utterance:
             continue
 
@@ -435,9 +840,11 @@ def cade_loop() -> None:
             print("[wake] No wake word detected (ignoring).")
             continue
 
+        # New turn: speech muted by an earlier barge-in may play again
+        clear_barge_in()
+
         # Visual: wake flash
-        if eye:
-            eye.wake_flash()
+        await eye_wake()
 
         command = strip_wake_word(utterance)
         print(f"[wake] Wake word detected. Initial command after strip: {command!r}")
@@ -445,54 +852,62 @@ def cade_loop() -> None:
         history = new_history()
 
         # Eye: active listening posture
-        if eye:
-            eye.listening()
+        eye_listen()
 
         # -------- FIRST RESPONSE --------
+        next_turn: asyncio.Future | None = None
         if command:
-            if eye:
-                eye.thinking()
-            # Stream the model response and join chunks
-            reply = get_streamed_reply(history, command)
-            handle_model_reply(history, command, reply, eye)
+            # Stream the model response, speaking sentences as they arrive
+            _, next_turn = await asyncio.gather(
+                eye_think(), respond_and_listen(history, command, eye)
+            )
         else:
             # No explicit command after wake word
             reply = "I'm here. What can I do for you?"
             print(f"Cade: {reply}")
-            if eye:
-                eye.speaking()
-            speak(reply)
+            eye_speak()
+            await asyncio.to_thread(speak, reply)
 
 
         # Back to active listening glow
-        if eye:
-            eye.listening()
+        eye_listen()
 
         # -------- ACTIVE STATE --------
         active = True
         while active:
             print("\n[STATE] ACTIVE listening for next instruction...")
-            if eye:
-                eye.listening()
+            eye_listen()
 
-            user_utterance = listen_and_transcribe_auto()
+            if next_turn is not None:
+                # Already listening since the last reply started
+                user_utterance = await next_turn
+                next_turn = None
+            else:
+                user_utterance = await asyncio.to_thread(listen_and_transcribe_auto)
             if not user_utterance:
                 continue
 
             print(f"[ACTIVE] Heard: {user_utterance!r}")
+            clear_barge_in()
 
-            if "your internal ip" in user_utterance.lower() or "your local ip" in user_utterance.lower():
+            if is_ip_query(user_utterance):
                 ip = get_internal_ip()
                 reply = f"My internal IP address is {ip}."
-                speak(reply)
+                await asyncio.to_thread(speak, reply)
                 continue
 
 
             if is_shutdown(user_utterance):
                 print("Cade: Okay, shutting down. Thank you.")
-                if eye:
-                    eye.standby()
-                speak("Okay, going into standby mode")
+                # Summarize this session into long-term memory without
+                # holding up the return to IDLE
+                threading.Thread(
+                    target=update_long_term_memory_from_history,
+                    args=(history,),
+                    daemon=True,
+                ).start()
+                eye_standby()
+                await asyncio.to_thread(speak, "Okay, going into standby mode")
                 active = False
                 break
 
@@ -505,16 +920,18 @@ def cade_loop() -> None:
             if not user_utterance:
                 continue
 
-            if eye:
-                eye.thinking()
-
-            # Streamed reply
-            reply = get_streamed_reply(history, user_utterance)
-            handle_model_reply(history, user_utterance, reply, eye)
+            # Streamed reply; the next utterance is captured in parallel
+            _, next_turn = await asyncio.gather(
+                eye_think(), respond_and_listen(history, user_utterance, eye)
+            )
 
             # Back to listening glow for next turn
-            if eye:
-                eye.listening()
+            eye_listen()
+
+
+def cade_loop() -> None:
+    """Run the conversation loop on a single asyncio event loop."""
+    asyncio.run(cade_loop_async())
 
 
 if __name__ == "__main__":
@@ -26,26 +26,44 @@ from typing import List, Dict
 from voice_recognizer import listen_and_transcribe_auto
 from ai_backend import new_history, generate_response  # implemented in ai_backend.py
 
-from tts_backend import speak
-import subprocess
+from tts_backend import speak, play_wav_file, synthesize_to_wav
 import os
 import shutil
 import random
 import socket
+import tempfile
+import threading
+from pathlib import Path
 
 from eye_engine import DroidEye   # ?? add this
 
+try:
+    import ahocorasick  # optional: pyahocorasick, one pass over all phrases
+except ImportError:
+    ahocorasick = None
+
+# The LAN IP rarely changes; don't reopen a socket for every question.
+# Failures aren't cached, so a late DHCP lease is picked up on the next ask.
+IP_CACHE_SECONDS = 60.0
+_ip_cache = {"ts": 0.0, "ip": None}
+
+
 def get_internal_ip():
-    """Return the Pi's internal LAN IP address."""
+    """Return the Pi's internal LAN IP address (cached for IP_CACHE_SECONDS)."""
+    now = time.monotonic()
+    if _ip_cache["ip"] is not None and now - _ip_cache["ts"] < IP_CACHE_SECONDS:
+        return _ip_cache["ip"]
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         # Doesn't need to be reachable — just forces OS to pick the right adapter
         s.connect(("8.8.8.8", 80))
         ip = s.getsockname()[0]
         s.close()
-        return ip
     except Exception:
         return "Unknown"
+    _ip_cache["ts"] = now
+    _ip_cache["ip"] = ip
+    return ip
 
 
 # --------- CONFIG: wake words & shutdown phrases ---------
@@ -79,46 +97,73 @@ SHUTDOWN_PHRASES = [
     "bye kade",
     "see you later"
 ]
+
+# Questions answered locally with the Pi's LAN address
+IP_PHRASES = [
+    "your internal ip",
+    "your local ip"
+]
 THINKING_PHRASES = [
     "Hmm...",
     ""
 ]
 
+# THINKING_PHRASES index -> pre-synthesized WAV, filled in at startup
+_ACK_WAVS: Dict[int, Path] = {}
+
+
+def _prepare_thinking_acks() -> None:
+    """Synthesize each thinking phrase once so acks don't wait on TTS."""
+    for i, phrase in enumerate(THINKING_PHRASES):
+        if not phrase.strip():
+            continue  # silent entry: nothing to play
+        path = Path(tempfile.gettempdir()) / f"cade_ack_{i}.wav"
+        if synthesize_to_wav(phrase, path):
+            _ACK_WAVS[i] = path
+
+
 def quick_thinking_ack(eye=None):
     """Short filler while we spin up the real response."""
-    phrase = random.choice(THINKING_PHRASES)
+    i = random.randrange(len(THINKING_PHRASES))
     if eye:
         # quick little flicker so it feels alive
         eye.thinking(cycles=3)
-    speak(phrase)
+    if not THINKING_PHRASES[i].strip():
+        return
+    wav = _ACK_WAVS.get(i)
+    if wav is not None:
+        play_wav_file(wav)
+    else:
+        speak(THINKING_PHRASES[i])  # not synthesized (yet)
+
+# Resolved once at import instead of walking PATH on every sound
+_APLAY = shutil.which("aplay")
+
 
 def play_sound(path: str) -> None:
     """
     Play a WAV file using aplay (most reliable on Raspberry Pi).
     aplay does NOT support MP3, so file must be .wav.
     """
-    # Confirm file exists
-    if not os.path.exists(path):
-        print(f"[play_sound] File not found: {path}")
-        return
-
-    # Confirm aplay is installed
-    if not shutil.which("aplay"):
+    # A missing file is reported by the player itself
+    if _APLAY is None:
         print("[play_sound] 'aplay' not found. Install with: sudo apt install alsa-utils")
         return
 
     try:
-        subprocess.Popen(
-            ["aplay", "-q", path],   # -q makes it quiet (no ALSA spam)
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
+        # Fed through tts_backend's persistent aplay (no fork/exec per sound);
+        # the write blocks while the sound plays, so do it off this thread.
+        threading.Thread(target=play_wav_file, args=(path,), kwargs={"wait": False}, daemon=True).start()
         print(f"[play_sound] Playing {path} with aplay")
     except Exception as e:
         print(f"[play_sound] Failed to play {path}: {e}")
 
 # --------- TEXT NORMALIZATION HELPERS ---------
 
+# Any run of non-alphanumerics (whitespace included) becomes one space
+_NORM_RE = re.compile(r"[^a-z0-9]+")
+
+
 def normalize(text: str) -> str:
     """
     Normalize text for matching:
@@ -126,10 +171,54 @@ def normalize(text: str) -> str:
     - strip non alphanumerics to spaces
     - collapse multiple spaces
     """
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return _NORM_RE.sub(" ", text.lower()).strip()
+
+
+# The phrase lists are constant; normalize them once instead of per utterance
+_WAKE_NORM = tuple(filter(None, map(normalize, WAKE_WORDS)))
+_SHUTDOWN_NORM = tuple(filter(None, map(normalize, SHUTDOWN_PHRASES)))
+_IP_NORM = tuple(filter(None, map(normalize, IP_PHRASES)))
+
+
+def _build_phrase_automaton():
+    """
+    One Aho-Corasick automaton over every wake word, shutdown phrase and IP
+    question, built once at import. Wake words and IP phrases are padded
+    with spaces so they only match whole words. Returns None if
+    pyahocorasick isn't installed.
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for ww_norm in _WAKE_NORM:
+        key = f" {ww_norm} "
+        automaton.add_word(key, ("wake", len(key)))
+    for phrase_norm in _SHUTDOWN_NORM:
+        automaton.add_word(phrase_norm, ("kill", len(phrase_norm)))
+    for ip_norm in _IP_NORM:
+        key = f" {ip_norm} "
+        automaton.add_word(key, ("ip", len(key)))
+    automaton.make_automaton()
+    return automaton
+
+
+_PHRASE_AUTOMATON = _build_phrase_automaton()
+
+
+def _first_wake_end(padded: str) -> int:
+    """
+    End index (exclusive) in `padded` of the leftmost (then longest) wake
+    word, or -1. Only called when the automaton is available.
+    """
+    best_start, best_end = -1, -1
+    for end_idx, (tag, length) in _PHRASE_AUTOMATON.iter(padded):
+        if tag != "wake":
+            continue
+        start = end_idx - length + 1
+        if best_start == -1 or start < best_start or (start == best_start and end_idx + 1 > best_end):
+            best_start, best_end = start, end_idx + 1
+    return best_end
 
 
 def has_wake_word(text: str) -> bool:
@@ -148,11 +237,10 @@ def has_wake_word(text: str) -> bool:
         return False
 
     padded = f" {norm} "
-    for ww in WAKE_WORDS:
-        ww_norm = normalize(ww)
-        if ww_norm == "":
-            continue
+    if _PHRASE_AUTOMATON is not None:
+        return _first_wake_end(padded) != -1
 
+    for ww_norm in _WAKE_NORM:
         # exact match: "cade"
         if norm == ww_norm:
             return True
@@ -184,11 +272,11 @@ def strip_wake_word(text: str) -> str:
 
     padded = f" {norm} "
 
-    for ww in WAKE_WORDS:
-        ww_norm = normalize(ww)
-        if not ww_norm:
-            continue
+    if _PHRASE_AUTOMATON is not None:
+        end = _first_wake_end(padded)
+        return padded[end:].strip() if end != -1 else norm
 
+    for ww_norm in _WAKE_NORM:
         marker = f" {ww_norm} "
         idx = padded.find(marker)
         if idx != -1:
@@ -208,14 +296,29 @@ def is_shutdown(text: str) -> bool:
     if not norm:
         return False
 
-    for phrase in SHUTDOWN_PHRASES:
-        phrase_norm = normalize(phrase)
-        if phrase_norm and phrase_norm in norm:
+    if _PHRASE_AUTOMATON is not None:
+        return any(tag == "kill" for _, (tag, _len) in _PHRASE_AUTOMATON.iter(norm))
+
+    for phrase_norm in _SHUTDOWN_NORM:
+        if phrase_norm in norm:
             return True
 
     return False
 
 
+def is_ip_query(text: str) -> bool:
+    """True if the user is asking for Cade's LAN IP address."""
+    norm = normalize(text)
+    if not norm:
+        return False
+
+    padded = f" {norm} "
+    if _PHRASE_AUTOMATON is not None:
+        return any(tag == "ip" for _, (tag, _len) in _PHRASE_AUTOMATON.iter(padded))
+
+    return any(f" {ip_norm} " in padded for ip_norm in _IP_NORM)
+
+
 # --------- MAIN CONVERSATION LOOP ---------
 
 def cade_loop() -> None:
@@ -239,6 +342,9 @@ def cade_loop() -> None:
     print(f"[main] Startup sound path: {startup_sound}")
     play_sound(startup_sound)
 
+    # Pre-synthesize the thinking fillers while we wait for the wake word
+    threading.Thread(target=_prepare_thinking_acks, daemon=True).start()
+
     while True:
         # -------- IDLE STATE --------
         print("\n[STATE] IDLE waiting for wake word...")
@@ -301,7 +407,7 @@ def cade_loop() -> None:
 
             print(f"[ACTIVE] Heard: {user_utterance!r}")
 
-            if "your internal ip" in user_utterance.lower() or "your local ip" in user_utterance.lower():
+            if is_ip_query(user_utterance):
                 ip = get_internal_ip()
                 reply = f"My internal IP address is {ip}."
                 speak(reply)
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import re
 import subprocess
 import sys
 import shutil
@@ -13,6 +14,18 @@ CLEAR = "\033[2J\033[H"  # clear screen + home cursor
 
 SERVICE_NAME = "cade.service"
 
+# Every tag style_line cares about, in priority order, matched in one scan
+_LINE_STYLES = {
+    "[STATE]": BOLD + GREEN,
+    "[IDLE]": GREEN,
+    "[ACTIVE]": GREEN,
+    "[wake]": GREEN,
+    "ERROR": BOLD,    # red-ish, but we can keep it greenish by mixing; for now just dim
+    "Failed": BOLD,
+}
+_TAG_RE = re.compile("|".join(map(re.escape, _LINE_STYLES)))
+_TAG_PRIORITY = {tag: i for i, tag in enumerate(_LINE_STYLES)}
+
 
 def draw_header():
     cols = shutil.get_terminal_size((80, 20)).columns
@@ -32,14 +45,10 @@ def style_line(line: str) -> str:
     """Apply simple 'Star Wars terminal' styling based on content."""
     line = line.rstrip("\n")
 
-    # Highlight Cade state tags if present
-    if "[STATE]" in line:
-        return BOLD + GREEN + line + RESET
-    if "[IDLE]" in line or "[ACTIVE]" in line or "[wake]" in line:
-        return GREEN + line + RESET
-    if "ERROR" in line or "Failed" in line:
-        # red-ish, but we can keep it greenish by mixing; for now just dim
-        return BOLD + line + RESET
+    # Highlight Cade state tags if present (highest-priority tag wins)
+    tags = _TAG_RE.findall(line)
+    if tags:
+        return _LINE_STYLES[min(tags, key=_TAG_PRIORITY.__getitem__)] + line + RESET
 
     # Default: dim green
     return DIM + GREEN + line + RESET
@@ -63,11 +72,14 @@ def main():
         print("journalctl not found. Are you on systemd?")
         sys.exit(1)
 
+    # Write pre-encoded bytes straight to the stdout buffer: cheaper than
+    # print() per line when journalctl is streaming fast
+    out = sys.stdout.buffer
     try:
         for raw_line in proc.stdout:
             # On first run, journalctl prints some history; you can keep or trim.
-            styled = style_line(raw_line)
-            print(styled)
+            out.write((style_line(raw_line) + "\n").encode("utf-8", "replace"))
+            out.flush()
     except KeyboardInterrupt:
         print("\n" + DIM + "Closing K4D3 console..." + RESET)
     finally:
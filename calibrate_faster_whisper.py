@@ -1,15 +1,50 @@
+import math
 import pyaudio
 import numpy as np
 from faster_whisper import WhisperModel
 import threading
 import queue
+from collections import deque
+import sys
 import time  # Added missing import
 
+try:
+    from numba import njit  # optional: compiled dB kernel for the read loop
+except ImportError:
+    njit = None
+
+
+# Volume floor: silence (or an empty read) reports -60 dB. Clamping the mean
+# square to the matching value replaces the old zero/empty special cases.
+SILENCE_DB = -60.0
+_MIN_MEAN_SQUARED = (32768.0 * 10 ** (SILENCE_DB / 20)) ** 2
+
+
+def _db_kernel(x):
+    """int16 samples -> volume in dB; loops are fine once numba compiles this"""
+    s = 0.0
+    for i in range(x.size):
+        v = float(x[i])
+        s += v * v
+    ms = max(s / max(x.size, 1), _MIN_MEAN_SQUARED)
+    return 20.0 * math.log10(math.sqrt(ms) / 32768.0)
+
+
+_db_jit = njit(cache=True, fastmath=True)(_db_kernel) if njit is not None else None
+
 class WhisperCalibration:
     def __init__(self, model_size="base"):
         self.audio_queue = queue.Queue()
         self.volume_threshold = -30  # Default threshold
         self.is_speaking = False
+        self._latest_db = -60.0   # written by the read loop, drawn by _render_loop
+        self._ring = deque(maxlen=64)  # raw 1024-frame blocks from the PortAudio callback (~4s)
+        self._scratch = np.empty(1024, dtype=np.float32)  # reused by calculate_volume
+        if _db_jit is not None:
+            # Compile now so JIT time doesn't land inside a calibration window.
+            # frombuffer, like calculate_volume: read-only arrays are their own
+            # numba specialization
+            _db_jit(np.frombuffer(bytes(2048), dtype=np.int16))
         self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
         
     def find_audio_device(self):
@@ -44,64 +79,70 @@ class WhisperCalibration:
     def calculate_volume(self, audio_data):
         """Calculate volume in dB safely"""
         audio_array = np.frombuffer(audio_data, dtype=np.int16)
-        if len(audio_array) == 0:
-            return -60
+        if _db_jit is not None:
+            return _db_jit(audio_array)
         
-        try:
-            # Use float32 to avoid overflow issues
-            audio_float = audio_array.astype(np.float32)
-            squared = audio_float ** 2
-            mean_squared = np.mean(squared)
-            
-            # Avoid sqrt of zero or negative numbers
-            if mean_squared <= 0:
-                return -60
-                
-            rms = np.sqrt(mean_squared)
-            if rms > 0:
-                return 20 * np.log10(rms / 32768.0)
-            else:
-                return -60
-        except Exception as e:
-            return -60
+        n = audio_array.size
+        
+        # Cast into a reused float32 buffer (no overflow, no per-frame
+        # allocation), then sum of squares as one dot product
+        if n > self._scratch.size:
+            self._scratch = np.empty(n, dtype=np.float32)
+        audio_float = self._scratch[:n]
+        np.copyto(audio_float, audio_array)
+        mean_squared = max(float(np.dot(audio_float, audio_float)) / max(n, 1), _MIN_MEAN_SQUARED)
+        return 20 * math.log10(math.sqrt(mean_squared) / 32768.0)
+    
+    def _open_input_stream(self, audio, device_index=None):
+        """Open a 16 kHz mono stream that pushes each block into self._ring from PortAudio's thread"""
+        self._ring.clear()
+        
+        def callback(in_data, frame_count, time_info, status):
+            self._ring.append(in_data)
+            return (None, pyaudio.paContinue)
+        
+        return audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=16000,
+            input=True,
+            input_device_index=device_index,
+            frames_per_buffer=1024,
+            stream_callback=callback
+        )
+    
+    def _drain_ring(self):
+        """Yield every block the callback has queued so far"""
+        ring = self._ring
+        while ring:
+            yield ring.popleft()
     
     def test_microphone(self, audio, device_index=None, duration=3):
         """Test if microphone is working"""
         print("Testing microphone...")
         
         try:
-            stream = audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=16000,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=1024
-            )
+            stream = self._open_input_stream(audio, device_index)
             
-            volumes = []
+            max_volume = -60
             start_time = time.time()
             
             while time.time() - start_time < duration:
-                try:
-                    data = stream.read(1024, exception_on_overflow=False)
+                db = None
+                for data in self._drain_ring():
                     db = self.calculate_volume(data)
-                    volumes.append(db)
-                    
+                    if db > max_volume:
+                        max_volume = db
+                
+                if db is not None:
                     # Show quick feedback
                     bar = '█' * max(0, min(20, int((db + 60) / 3)))
                     print(f"\rTesting: [{bar:20}] {db:6.1f} dB", end='')
-                    
-                except IOError as e:
-                    if "Input overflowed" in str(e):
-                        continue  # Skip overflow errors
-                    else:
-                        raise e
+                time.sleep(0.03)
             
             stream.stop_stream()
             stream.close()
             
-            max_volume = max(volumes) if volumes else -60
             print(f"\nMax volume detected: {max_volume:.1f} dB")
             
             return max_volume > -50  # Return True if some audio was detected
@@ -110,6 +151,31 @@ class WhisperCalibration:
             print(f"\nMicrophone test failed: {e}")
             return False
     
+    def _render_loop(self, stop_event, start_time, duration):
+        """Redraw the calibration meter every 100ms from the latest dB value"""
+        reset = '\033[0m'
+        while not stop_event.wait(0.1):
+            db = self._latest_db
+            bar_length = max(0, min(30, int((db + 60) / 2)))
+            bar = '█' * bar_length
+            spaces = ' ' * (30 - bar_length)
+            
+            # Color coding
+            if db > -25:
+                color = '\033[92m'  # Green
+            elif db > -40:
+                color = '\033[93m'  # Yellow
+            else:
+                color = '\033[91m'  # Red
+            
+            elapsed = min(time.time() - start_time, duration)
+            progress = int((elapsed / duration) * 40)
+            progress_bar = '█' * progress + '░' * (40 - progress)
+            
+            sys.stdout.write(f"\rTime: [{progress_bar}] {elapsed:.1f}s | "
+                             f"Volume: {color}[{bar}{spaces}]{reset} {db:6.1f} dB")
+            sys.stdout.flush()
+    
     def find_optimal_threshold(self, duration=10):
         """Find optimal volume threshold for speech detection"""
         print("Microphone Calibration for faster-whisper")
@@ -131,75 +197,56 @@ class WhisperCalibration:
         
         print(f"\nSpeak naturally for {duration} seconds to calibrate...")
         
+        # One dB value per 1024-sample frame at 16 kHz, plus slack for timing jitter
+        self._vols = np.empty(int(duration * 16000 / 1024) + 32, dtype=np.float32)
+        n = 0
+        render_stop = threading.Event()
+        
         try:
-            stream = audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=16000,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=1024
-            )
+            stream = self._open_input_stream(audio, device_index)
             
-            volumes = []
             start_time = time.time()
-            last_update = 0
+            self._latest_db = -60.0
+            
+            # The display is drawn on its own thread so stdout latency never
+            # delays the analysis loop
+            renderer = threading.Thread(
+                target=self._render_loop,
+                args=(render_stop, start_time, duration),
+                daemon=True,
+            )
+            renderer.start()
             
+            # Audio arrives on PortAudio's thread; this loop only drains it
             while time.time() - start_time < duration:
-                try:
-                    data = stream.read(1024, exception_on_overflow=False)
+                for data in self._drain_ring():
                     db = self.calculate_volume(data)
-                    volumes.append(db)
-                    
-                    # Update display at reasonable frequency (not every loop)
-                    current_time = time.time()
-                    if current_time - last_update > 0.1:  # Update every 100ms
-                        bar_length = max(0, min(30, int((db + 60) / 2)))
-                        bar = '█' * bar_length
-                        spaces = ' ' * (30 - bar_length)
-                        
-                        # Color coding
-                        if db > -25:
-                            color = '\033[92m'  # Green
-                        elif db > -40:
-                            color = '\033[93m'  # Yellow
-                        else:
-                            color = '\033[91m'  # Red
-                        
-                        reset = '\033[0m'
-                        
-                        elapsed = time.time() - start_time
-                        progress = int((elapsed / duration) * 40)
-                        progress_bar = '█' * progress + '░' * (40 - progress)
-                        
-                        print(f"\rTime: [{progress_bar}] {elapsed:.1f}s | "
-                              f"Volume: {color}[{bar}{spaces}]{reset} {db:6.1f} dB", 
-                              end='', flush=True)
-                        last_update = current_time
-                    
-                except IOError as e:
-                    if "Input overflowed" in str(e):
-                        continue  # Skip overflow errors
-                    else:
-                        print(f"\nAudio error: {e}")
-                        break
+                    self._latest_db = db
+                    if n == self._vols.size:
+                        self._vols = np.resize(self._vols, 2 * n)
+                    self._vols[n] = db
+                    n += 1
+                time.sleep(0.03)
             
+            render_stop.set()
+            renderer.join()
             stream.stop_stream()
             stream.close()
             
         except Exception as e:
             print(f"\nError during calibration: {e}")
         finally:
+            render_stop.set()
             audio.terminate()
         
         # Calculate optimal threshold
-        if volumes:
-            volumes_array = np.array(volumes)
+        if n:
+            volumes_array = self._vols[:n]
             
             print(f"\n\n{'='*50}")
             print("CALIBRATION RESULTS")
             print(f"{'='*50}")
-            print(f"Samples collected: {len(volumes)}")
+            print(f"Samples collected: {n}")
             print(f"Average volume: {np.mean(volumes_array):.1f} dB")
             print(f"Maximum volume: {np.max(volumes_array):.1f} dB")
             print(f"Minimum volume: {np.min(volumes_array):.1f} dB")
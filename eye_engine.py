@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 # -*- coding:utf-8 -*-
 
+import asyncio
 import time
 import math
 import os
 import sys
-from PIL import Image, ImageDraw
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
 
 # Path to Waveshare LCD driver
 LCD_PROJECT_PATH = "/home/seanakutagawa/LCD_Module_RPI_code/RaspberryPi/python"
@@ -14,6 +19,26 @@ if LCD_PROJECT_PATH not in sys.path:
 
 from lib import LCD_2inch4
 
+# The Waveshare driver's own ShowImage converts RGB888 to RGB565 on every
+# call. With these primitives available we hand it packed 565 bytes instead.
+_RAW_SPI_ATTRS = ("command", "data", "SetWindows", "digital_write", "spi_writebyte", "DC_PIN")
+_SPI_CHUNK = 4096
+
+# Frames handed to the SPI thread but not yet on the panel. With the one
+# being composed that's three buffers: one on the wire, one queued, one drawing.
+_MAX_FRAMES_IN_FLIGHT = 2
+
+# Pulse animations index one period of a sine, sampled this many times
+_SIN_STEPS = 256
+
+
+def _pulse_table(base, depth, quantum=1):
+    """Brightness over one sine period, base +/- depth, rounded down to `quantum`."""
+    return [
+        int(base + depth * math.sin(2 * math.pi * i / _SIN_STEPS)) // quantum * quantum
+        for i in range(_SIN_STEPS)
+    ]
+
 
 class DroidEye:
     def __init__(self):
@@ -40,8 +65,66 @@ class DroidEye:
         self.cx = self.width // 2
         self.cy = self.height // 2
         self.radius = min(self.width, self.height) // 3
+        self._raw_spi = all(hasattr(self.disp, a) for a in _RAW_SPI_ATTRS)
+
+        # Furthest the orb can move from center, and its precomputed glow
+        self.max_offset = self.radius
+        self._orb_profile = self._build_orb_profile()
+
+        # Whole-pixel distance from screen center, for the shutdown fade
+        yy, xx = np.mgrid[:self.height, :self.width]
+        self._radial = np.hypot(xx - self.cx, yy - self.cy).astype(np.int16)
+
+        # Rendered frames by (dx, dy, brightness); the state helpers and the
+        # thinking pulse reuse a small fixed set, so most draws are cache hits
+        self._frame_cache = OrderedDict()
+        self._frame_cache_size = 32
+
+        # Brightness per phase for the pulse animations (phase & 255 indexes them).
+        # Breathing is rounded to steps of 4 so its frames stay in the cache.
+        self._think_table = _pulse_table(160, 70)
+        self._breathe_table = _pulse_table(90, 25, quantum=4)
+        self._test_table = _pulse_table(150, 80)
+
+        # Frame currently on the panel (None = unknown/cleared), so _show can
+        # skip repeats and only resend the rows that changed. Only the SPI
+        # thread touches it.
+        self._shown = None
+
+        # Guards _frame_cache, _in_flight and _raw_spi: frames are drawn from
+        # the event loop or a caller's thread while the SPI thread may drop
+        # the raw path. Never held while waiting on the SPI thread.
+        self._lock = threading.Lock()
+
+        # All panel writes happen on this one thread, in order, so composing
+        # the next frame overlaps the SPI transfer of the current one
+        self._spi_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eye-spi")
+        self._in_flight = deque()
+
+        # Bumped by speaking(), so a thinking pulse still running alongside
+        # the reply stops instead of overwriting the speaking glow
+        self._speak_count = 0
 
         self.running = True
+
+    def _build_orb_profile(self):
+        """
+        Gray level (per unit brightness) of the centered orb on a canvas padded
+        by max_offset on every side, so any offset is just a slice of it.
+        Same look as before: 8 concentric disks, each dimmer further out.
+        """
+        pad = self.max_offset
+        h, w = self.height + 2 * pad, self.width + 2 * pad
+        yy, xx = np.mgrid[:h, :w]
+        dist = np.hypot(xx - (self.cx + pad), yy - (self.cy + pad))
+
+        profile = np.zeros((h, w), dtype=np.float32)
+        layers = 8
+        for i in range(layers):
+            # outer to inner; each smaller, brighter disk overwrites the last
+            factor = (layers - i) / layers
+            profile[dist <= int(self.radius * factor)] = factor * 0.5   # outer layers are softer
+        return profile
         
     # -------------------------------------------------------------
     # DRAW THE EYE
@@ -50,37 +133,107 @@ class DroidEye:
         """Draw a single fuzzy glowing orb that can move around."""
 
         brightness = max(0, min(255, int(brightness)))
+        max_off = self.max_offset
+        dx = max(-max_off, min(max_off, int(x_offset)))
+        dy = max(-max_off, min(max_off, int(y_offset)))
 
-        # Base image
-        img = Image.new("RGB", (self.width, self.height), (0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        key = (dx, dy, brightness)
+        with self._lock:
+            frame = self._frame_cache.get(key)
+            if frame is None:
+                frame = self._make_frame(dx, dy, brightness)
+                self._frame_cache[key] = frame
+                if len(self._frame_cache) > self._frame_cache_size:
+                    self._frame_cache.popitem(last=False)
+            else:
+                self._frame_cache.move_to_end(key)
 
-        # Orb position
-        max_off = self.radius
-        ox = self.cx + max(-max_off, min(max_off, x_offset))
-        oy = self.cy + max(-max_off, min(max_off, y_offset))
+        self._submit(frame)
 
-        # Orb radius
-        r = self.radius
+    def _submit(self, frame):
+        """Queue a frame for the SPI thread, waiting only if the queue is full."""
+        while True:
+            with self._lock:
+                if len(self._in_flight) < _MAX_FRAMES_IN_FLIGHT:
+                    self._in_flight.append(self._spi_pool.submit(self._show, frame))
+                    return
+                oldest = self._in_flight.popleft()
+            oldest.result()
 
-        # Well draw a fuzzy glow manually with concentric alpha layers
-        layers = 8
-        for i in range(layers):
-            # The farther out the circle, the dimmer it is
-            factor = (layers - i) / layers
-            alpha = int(brightness * factor * 0.5)   # outer layers are softer
+    def flush(self):
+        """Block until every queued frame is on the panel."""
+        while True:
+            with self._lock:
+                if not self._in_flight:
+                    return
+                oldest = self._in_flight.popleft()
+            oldest.result()
 
-            rr = int(r * factor)
+    def _make_frame(self, dx, dy, brightness):
+        """Render the orb at (cx + dx, cy + dy); offsets are already clamped."""
+        # Pick the window of the padded profile that centers the orb there
+        max_off = self.max_offset
+        top, left = max_off - dy, max_off - dx
+        window = self._orb_profile[top:top + self.height, left:left + self.width]
 
-            # Convert alpha to a gray level since the panel isn't alpha-capable
-            gray = alpha
+        # Gray level per pixel since the panel isn't alpha-capable
+        return self._pack_gray((window * brightness).astype(np.uint8))
 
-            draw.ellipse(
-                (ox - rr, oy - rr, ox + rr, oy + rr),
-                fill=(gray, gray, gray)
-            )
+    def _pack_gray(self, gray):
+        """
+        A uint8 gray frame in whatever form _show pushes fastest: big-endian
+        RGB565 bytes (2 per pixel) for the raw SPI path, else a PIL image.
+        """
+        if not self._raw_spi:
+            return Image.fromarray(np.dstack((gray, gray, gray)), "RGB")
+        hi = (gray & 0xF8) | (gray >> 5)             # RRRRRGGG
+        lo = ((gray << 3) & 0xE0) | (gray >> 3)      # GGGBBBBB
+        return np.dstack((hi, lo)).tobytes()
+
+    def _dirty_rows(self, frame):
+        """[y0, y1) span of rows where `frame` differs from what's on screen."""
+        if not isinstance(self._shown, bytes):
+            return 0, self.height
+        row_bytes = self.width * 2
+        new = np.frombuffer(frame, dtype=np.uint8).reshape(self.height, row_bytes)
+        old = np.frombuffer(self._shown, dtype=np.uint8).reshape(self.height, row_bytes)
+        changed = np.flatnonzero((new != old).any(axis=1))
+        if changed.size == 0:
+            return 0, 0
+        return int(changed[0]), int(changed[-1]) + 1
+
+    def _show(self, frame):
+        if frame is self._shown:
+            return  # the same cached frame is already on the panel
+        if not isinstance(frame, bytes):
+            self.disp.ShowImage(frame)
+            self._shown = frame
+            return
+        try:
+            y0, y1 = self._dirty_rows(frame)
+            if y0 < y1:
+                disp = self.disp
+                # Same window setup as the driver's ShowImage for an unrotated
+                # frame, limited to the changed rows
+                disp.command(0x36)
+                disp.data(0x08)
+                disp.SetWindows(0, y0, self.width, y1)
+                disp.digital_write(disp.DC_PIN, True)
+                row_bytes = self.width * 2
+                for i in range(y0 * row_bytes, y1 * row_bytes, _SPI_CHUNK):
+                    disp.spi_writebyte(frame[i:min(i + _SPI_CHUNK, y1 * row_bytes)])
+            self._shown = frame
+        except Exception as e:
+            self._shown = None
+            print("[eye] Raw RGB565 push failed, using ShowImage:", e)
+            with self._lock:
+                self._raw_spi = False
+                self._frame_cache.clear()
+            gray = np.frombuffer(frame, dtype=np.uint8)[0::2].reshape(self.height, self.width)
+            # hi byte holds 5 bits of the gray level; close enough for one frame
+            gray = gray & 0xF8
+            self.disp.ShowImage(Image.fromarray(np.dstack((gray, gray, gray)), "RGB"))
 
-        self.disp.ShowImage(img)
     # -------------------------------------------------------------
     # STATE HELPERS
     # -------------------------------------------------------------
@@ -102,21 +255,60 @@ class DroidEye:
 
     def thinking(self, cycles: int = 6):
         """Short pulse effect while generating a reply."""
-        t = 0.0
+        phase = 0
         for _ in range(cycles):
-            b = int(160 + 70 * math.sin(t))
-            self._draw_eye(brightness=b)
-            t += 0.6
+            self._draw_eye(brightness=self._think_table[phase & 255])
+            phase += 24   # ~0.6 rad
             time.sleep(0.05)
 
     def speaking(self):
         """Steady, confident glow while TTS is playing."""
+        self._speak_count += 1
         self._draw_eye(brightness=190)
 
     def standby(self):
         """Dimmer glow when going back to sleep / standby."""
         self._draw_eye(brightness=30)
 
+    # -------------------------------------------------------------
+    # ASYNC ANIMATIONS (for the asyncio conversation loop)
+    # -------------------------------------------------------------
+    async def wake_flash_async(self):
+        """wake_flash() that yields to the event loop between frames."""
+        for _ in range(2):
+            self._draw_eye(brightness=255)
+            await asyncio.sleep(0.08)
+            self._draw_eye(brightness=130)
+            await asyncio.sleep(0.08)
+
+    async def thinking_async(self, cycles: int = 6):
+        """
+        thinking() that yields to the event loop between frames. Ends early
+        if speaking() is called meanwhile (e.g. a cached first sentence).
+        """
+        speak_count = self._speak_count
+        phase = 0
+        for _ in range(cycles):
+            if self._speak_count != speak_count:
+                return
+            self._draw_eye(brightness=self._think_table[phase & 255])
+            phase += 24   # ~0.6 rad
+            await asyncio.sleep(0.05)
+
+    async def breathe(self):
+        """
+        Slow breathing glow around the idle level until cancelled, e.g. while
+        the mic waits for the wake word. Ends on the steady idle glow.
+        """
+        phase = 0
+        try:
+            while True:
+                self._draw_eye(brightness=self._breathe_table[phase & 255])
+                phase += 6   # ~0.15 rad
+                await asyncio.sleep(0.08)
+        finally:
+            self.idle()
+
 
     # -------------------------------------------------------------
     # QUICK TEST ANIMATION
@@ -133,28 +325,30 @@ class DroidEye:
             time.sleep(0.4)
 
         print("[eye-test] Breathing brightness")
-        t = 0
+        phase = 0
         for _ in range(40):
-            b = int(150 + 80 * math.sin(t))
-            self._draw_eye(brightness=b)
-            t += 0.2
+            self._draw_eye(brightness=self._test_table[phase & 255])
+            phase += 8   # ~0.2 rad
             time.sleep(0.05)
 
     # -------------------------------------------------------------
     def shutdown(self):
         """Fade the eye out."""
         for r in range(self.radius, 0, -4):
-            img = Image.new("RGB", (self.width, self.height), "black")
-            draw = ImageDraw.Draw(img)
-            draw.ellipse(
-                (self.cx - r, self.cy - r,
-                 self.cx + r, self.cy + r),
-                fill="white"
-            )
-            self.disp.ShowImage(img)
+            # White disk of radius r: one compare against the distance map
+            g = np.where(self._radial <= r, 255, 0).astype(np.uint8)
+            with self._lock:
+                frame = self._pack_gray(g)
+            self._submit(frame)
             time.sleep(0.02)
 
+        self.flush()
+        self._spi_pool.submit(self._clear_panel).result()
+
+    def _clear_panel(self):
+        """Blank the panel (SPI thread only, like every other panel write)."""
         self.disp.clear()
+        self._shown = None
 
 
 # -------------------------------------------------------------
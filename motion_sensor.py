@@ -1,5 +1,5 @@
 import RPi.GPIO as GPIO
-import time
+import signal
 
 SENSOR_PIN = 17
 
@@ -8,11 +8,17 @@ GPIO.setup(SENSOR_PIN, GPIO.IN)
 
 print("RCWL-0516 Radar Sensor Test (Ctrl+C to exit)")
 
+
+def on_motion(channel):
+    print("Motion detected!")
+
+
 try:
-    while True:
-        if GPIO.input(SENSOR_PIN) == 1:
-            print("Motion detected!")
-        time.sleep(0.1)
+    # Sleep until the pin goes high instead of polling it every 100 ms
+    GPIO.add_event_detect(SENSOR_PIN, GPIO.RISING, callback=on_motion, bouncetime=200)
+    signal.pause()
 
 except KeyboardInterrupt:
+    pass
+finally:
     GPIO.cleanup()
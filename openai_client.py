@@ -0,0 +1,34 @@
+# openai_client.py
+#
+# Shared OpenAI clients for K4D3 ("Cade").
+# Chat (ai_backend), TTS (tts_backend), vision (vision_backend) and the
+# semantic cache all go through one pooled keep-alive connection, so a call
+# after another module's call skips DNS + TCP + TLS setup.
+
+from __future__ import annotations
+
+import importlib.util
+import os
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2]).
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=8, keepalive_expiry=120)
+_HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+http_client = httpx.Client(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+# Uses OPENAI_API_KEY from environment.
+client = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    http_client=http_client,
+)
+
+# Async twin for the asyncio conversation loop in cade_brain. Its pool binds
+# to the first event loop that uses it, so use it from one loop only.
+async_client = AsyncOpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+)
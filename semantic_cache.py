@@ -0,0 +1,231 @@
+"""
+semantic_cache.py
+
+Semantic reply cache for K4D3 ("Cade").
+
+Voice requests repeat a lot ("tell me about yourself", "what can you do").
+When a new utterance embeds close enough (cosine >= SIMILARITY_THRESHOLD) to
+one we've already answered, the stored reply is reused and the LLM call is
+skipped entirely.
+
+Only context-free requests are cached: ai_backend checks is_cacheable() and
+only consults the cache on the first turn of a session. Time-sensitive
+questions (time, date, weather, news, ...) are never cached.
+
+- Embeddings: OpenAI text-embedding-3-small, memoized in-process
+- Search: the newest MAX_ENTRIES embeddings live in one contiguous float16
+  NumPy matrix (rows L2-normalized), so a lookup is a single matmul
+- Storage: the matrix is saved with np.save under .sem_cache/, next to a
+  small JSON index of keys/replies/timestamps, for cold starts. Writes are
+  batched (every SAVE_EVERY stores, plus once at exit) to spare the SD card.
+
+Public functions:
+    is_cacheable(text: str) -> bool
+    lookup(text: str) -> Optional[str]
+    store(text: str, reply: str) -> None
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from openai_client import client
+
+# ---------- CONFIG ----------
+
+ROOT_DIR = Path(__file__).resolve().parent
+CACHE_DIR = ROOT_DIR / ".sem_cache"
+MATRIX_PATH = CACHE_DIR / "embeddings.npy"
+INDEX_PATH = CACHE_DIR / "index.json"
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+SIMILARITY_THRESHOLD = 0.95
+MAX_ENTRIES = 200              # newest entries kept in the search matrix
+ENTRY_TTL = 24 * 3600          # seconds before a cached reply goes stale
+MAX_QUERY_CHARS = 200          # longer prompts (e.g. tool follow-ups) aren't cached
+SAVE_EVERY = 8                 # stores between disk writes; the rest is saved at exit
+
+# Answers to these go stale immediately, so never serve them from cache
+_TIME_SENSITIVE_RE = re.compile(
+    r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|weather|"
+    r"temperature|news|latest|current|ip)\b",
+    re.IGNORECASE,
+)
+# ---------------------------
+
+_lock = threading.Lock()
+_save_lock = threading.Lock()  # one writer at a time; taken before _lock
+_unsaved = 0                   # stores since the last save
+_keys: List[str] = []
+_replies: List[str] = []
+_created: List[float] = []
+# (n, EMBEDDING_DIM) float16, C-contiguous, rows L2-normalized
+_matrix = np.empty((0, EMBEDDING_DIM), dtype=np.float16)
+
+
+# ---------- UTILITIES ----------
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _key(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _embed_normalized(norm: str) -> np.ndarray:
+    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=norm)
+    vec = np.asarray(resp.data[0].embedding, dtype=np.float32)
+    norm_len = float(np.linalg.norm(vec))
+    if norm_len > 0:
+        vec /= norm_len
+    # Normalize in float32, then quantize: halves memory and the file on disk.
+    # NumPy has no BLAS path for float16, so the lookup matmul is a plain loop,
+    # but at MAX_ENTRIES rows that is still only a few milliseconds.
+    vec = vec.astype(np.float16)
+    vec.setflags(write=False)   # shared via lru_cache; keep it immutable
+    return vec
+
+
+def _embed(text: str) -> np.ndarray:
+    return _embed_normalized(_normalize(text))
+
+
+def _append_entry(key: str, vec: np.ndarray, reply: str, created: float) -> None:
+    """Add one row to the in-memory index, evicting the oldest past MAX_ENTRIES."""
+    global _matrix
+    if key in _keys:
+        idx = _keys.index(key)
+        del _keys[idx], _replies[idx], _created[idx]
+        _matrix = np.delete(_matrix, idx, axis=0)
+
+    keep = _matrix[-(MAX_ENTRIES - 1):] if MAX_ENTRIES > 1 else _matrix[:0]
+    overflow = len(_keys) - len(keep)
+    if overflow > 0:
+        del _keys[:overflow], _replies[:overflow], _created[:overflow]
+
+    # np.vstack always returns a fresh C-contiguous array
+    _matrix = np.vstack([keep, vec.reshape(1, -1).astype(np.float16, copy=False)])
+    _keys.append(key)
+    _replies.append(reply)
+    _created.append(created)
+
+
+def _save_to_disk(matrix: np.ndarray, keys: List[str], replies: List[str], created: List[float]) -> None:
+    """Write a snapshot of the matrix and its index atomically."""
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        tmp_matrix = MATRIX_PATH.with_suffix(".tmp.npy")
+        np.save(tmp_matrix, matrix)
+        tmp_index = INDEX_PATH.with_suffix(".json.tmp")
+        tmp_index.write_text(
+            json.dumps({"keys": keys, "replies": replies, "created": created}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_matrix, MATRIX_PATH)
+        os.replace(tmp_index, INDEX_PATH)
+    except Exception as e:
+        print(f"[semantic_cache] Failed to save cache: {e}")
+
+
+def _flush() -> None:
+    """Save unsaved entries, if any. Lookups only wait for the snapshot."""
+    global _unsaved
+    with _save_lock:
+        with _lock:
+            if not _unsaved:
+                return
+            _unsaved = 0
+            # _matrix is replaced, never modified in place, so no copy needed
+            snapshot = (_matrix, list(_keys), list(_replies), list(_created))
+        _save_to_disk(*snapshot)
+
+
+def _load_from_disk() -> None:
+    if not MATRIX_PATH.exists() or not INDEX_PATH.exists():
+        return
+    try:
+        matrix = np.load(MATRIX_PATH)
+        index = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+        keys, replies, created = index["keys"], index["replies"], index["created"]
+    except Exception as e:
+        print(f"[semantic_cache] Ignoring unreadable cache: {e}")
+        return
+    if matrix.ndim != 2 or matrix.shape != (len(keys), EMBEDDING_DIM):
+        print("[semantic_cache] Cache shape mismatch; starting fresh.")
+        return
+
+    now = time.time()
+    for i, key in enumerate(keys):
+        if now - created[i] <= ENTRY_TTL:
+            _append_entry(key, matrix[i], replies[i], created[i])
+    if _keys:
+        print(f"[semantic_cache] Loaded {len(_keys)} cached replies.")
+
+
+# ---------- PUBLIC API ----------
+
+def is_cacheable(text: str) -> bool:
+    """Short, context-free, not time-sensitive."""
+    text = (text or "").strip()
+    return 0 < len(text) <= MAX_QUERY_CHARS and not _TIME_SENSITIVE_RE.search(text)
+
+
+def lookup(text: str) -> Optional[str]:
+    """Return a cached reply for a semantically equivalent utterance, or None."""
+    with _lock:
+        if not _keys:
+            return None
+    try:
+        query = _embed(text)
+    except Exception as e:
+        print(f"[semantic_cache] Embedding failed: {e}")
+        return None
+
+    with _lock:
+        if not _keys:
+            return None
+        sims = _matrix @ query
+        best = int(sims.argmax())
+        score = float(sims[best])
+        if score < SIMILARITY_THRESHOLD or time.time() - _created[best] > ENTRY_TTL:
+            return None
+        print(f"[semantic_cache] Hit (similarity {score:.3f}).")
+        return _replies[best]
+
+
+def store(text: str, reply: str) -> None:
+    """Remember `reply` as the answer to `text`."""
+    if not reply:
+        return
+    try:
+        vec = _embed(text)
+    except Exception as e:
+        print(f"[semantic_cache] Embedding failed: {e}")
+        return
+
+    global _unsaved
+    key = _key(text)
+    now = time.time()
+    with _lock:
+        _append_entry(key, vec, reply, now)
+        _unsaved += 1
+        due = _unsaved >= SAVE_EVERY
+    if due:
+        _flush()
+
+
+_load_from_disk()
+atexit.register(_flush)
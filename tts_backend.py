@@ -6,24 +6,40 @@ Text-to-speech backend for K4D3 ("Cade").
 Primary:
     - OpenAI TTS (requires OPENAI_API_KEY)
     - Uses gpt-4o-mini-tts (or similar) to synthesize speech
-    - Saves to a WAV file and plays it via `aplay` (ALSA) on Raspberry Pi
+    - Keeps each synthesized line in tts_cache/ (keyed by model|voice|text),
+      so repeated phrases skip the API call entirely
+    - Streams the WAV response straight into one long-lived `aplay` (ALSA)
+      process on the Raspberry Pi, so playback starts with the first chunk
 
 Fallback (optional):
     - Piper TTS via CLI, if installed and configured
 
-Public function:
+Public functions:
     speak(text: str) -> None
+    preload_tts(phrases=None) -> None   (pre-synthesize fixed lines into the cache)
+    synthesize_to_wav(text: str, out_path: Path) -> bool
+    stop_speaking() -> None   (barge-in: cut off whatever is playing)
+    clear_barge_in() -> None  (start of a turn: allow speech again)
+    barge_in_requested() -> bool
+    play_wav_file(path, wait=True) -> None
 """
 
 from __future__ import annotations
 
+import hashlib
 import os
+import re
+import struct
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
-from openai import OpenAI
+from openai_client import client  # shared keep-alive connection
 
 # ---------- CONFIG ----------
 
@@ -33,7 +49,39 @@ OPENAI_TTS_VOICE = "onyx"            # or another supported voice
 
 # Playback command on Raspberry Pi
 # aplay is usually available via: sudo apt-get install alsa-utils
-PLAYBACK_CMD = ["aplay"]  # will append the filename at runtime
+# Output device: empty = ALSA default. Naming the card directly (e.g.
+# CADE_APLAY_DEVICE=plughw:CARD=Device,DEV=0 for a USB speaker) skips the
+# default-device plugins.
+APLAY_DEVICE = os.environ.get("CADE_APLAY_DEVICE", "")
+# ALSA ring buffer, in frames: a few large periods ride out scheduling
+# hiccups on the Pi without underrunning. aplay would wait for the whole
+# buffer before starting; start once APLAY_START_DELAY_US is queued instead.
+APLAY_BUFFER_FRAMES = 16384
+APLAY_PERIOD_FRAMES = 4096
+APLAY_START_DELAY_US = 200000
+APLAY_ARGS = [
+    "-q",
+    f"--buffer-size={APLAY_BUFFER_FRAMES}",
+    f"--period-size={APLAY_PERIOD_FRAMES}",
+    f"--start-delay={APLAY_START_DELAY_US}",
+] + (["-D", APLAY_DEVICE] if APLAY_DEVICE else [])
+PLAYBACK_CMD = ["aplay"] + APLAY_ARGS  # will append the filename at runtime
+
+# On-disk cache of synthesized speech; oldest files beyond this are removed
+TTS_CACHE_MAX_FILES = 128
+
+# Fixed lines Cade says often; preload_tts() puts them in the cache at boot
+# so even their first use plays instantly. Set CADE_TTS_PRELOAD=0 to skip.
+PRELOAD_PHRASES = [
+    "I'm here. What can I do for you?",
+    "Okay, going into standby mode",
+    "Hello, I am Cade.",
+]
+PRELOAD_ENABLED = os.environ.get("CADE_TTS_PRELOAD", "1") == "1"
+
+# speak() synthesizes longer text one sentence at a time, so sentence N+1 is
+# fetched while N plays. Shorter pieces ("Hi." "Dr.") join the next one.
+SENTENCE_MIN_CHARS = 24
 
 # Optional Piper fallback (if you install it later)
 PIPER_ENABLED = False
@@ -49,20 +97,266 @@ PIPER_CMD = [
 
 
 ROOT_DIR = Path(__file__).resolve().parent
+CACHE_DIR = ROOT_DIR / "tts_cache"
+
+
+# Barge-in state: the aplay process currently playing, and whether a stop
+# was requested since the current turn started (see clear_barge_in()).
+_playback_lock = threading.Lock()
+_current_playback: Optional[subprocess.Popen] = None
+_stop_requested = threading.Event()
+
+# Persistent PCM player: one long-lived `aplay` reading raw frames from stdin,
+# so short streamed chunks don't each pay a fork/exec + ALSA open. It is only
+# respawned when the audio format changes (or after a barge-in kill).
+_pcm_lock = threading.Lock()
+_pcm_proc: Optional[subprocess.Popen] = None
+_pcm_format: Optional[Tuple[int, int, int]] = None   # (rate, channels, sampwidth)
+_pcm_busy_until = 0.0                                 # monotonic end of queued audio
+_pcm_queued_until = 0.0                               # same, including silence padding
+_pcm_frames_written = 0                               # since spawn, for period alignment
+_pcm_run_frames = 0                                   # since playback last went idle
 
-# Use same env var as ai_backend
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+_ALSA_SAMPLE_FORMATS = {1: "U8", 2: "S16_LE", 3: "S24_3LE", 4: "S32_LE"}
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
 
 
 # ---------- UTILITIES ----------
 
-def _play_wav(path: Path) -> None:
+def _parse_wav(data: bytes) -> Tuple[bytes, int, int, int]:
+    """
+    Split a RIFF/WAVE blob into (pcm_frames, rate, channels, sampwidth).
+
+    The data chunk is taken to the end of the blob: streamed WAVs (like
+    OpenAI's) carry a placeholder data size in the header.
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        (size,) = struct.unpack_from("<I", data, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            _tag, channels, rate, _byte_rate, _align, bits = struct.unpack_from("<HHIIHH", data, body)
+            fmt = (rate, channels, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            return (data[body:],) + fmt
+        pos = body + size + (size & 1)
+
+    raise ValueError("no data chunk")
+
+
+def _close_pcm_pipe() -> None:
+    """Let the current player drain whatever it was given, then reap it."""
+    global _pcm_proc, _pcm_format
+    proc, _pcm_proc, _pcm_format = _pcm_proc, None, None
+    if proc is None:
+        return
+    try:
+        proc.stdin.close()
+    except Exception:
+        pass
+    proc.wait()
+
+
+def _pcm_pipe(rate: int, channels: int, sampwidth: int) -> subprocess.Popen:
+    """Return a live aplay process for this format, spawning one if needed."""
+    global _pcm_proc, _pcm_format, _pcm_busy_until, _pcm_queued_until
+    global _pcm_frames_written, _pcm_run_frames
+    fmt = (rate, channels, sampwidth)
+    if _pcm_proc is not None and _pcm_proc.poll() is None and _pcm_format == fmt:
+        return _pcm_proc
+
+    _close_pcm_pipe()
+    cmd = [
+        "aplay", *APLAY_ARGS, "-t", "raw",
+        "-f", _ALSA_SAMPLE_FORMATS[sampwidth],
+        "-r", str(rate),
+        "-c", str(channels),
+    ]
+    _pcm_proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    _pcm_format = fmt
+    _pcm_busy_until = _pcm_queued_until = 0.0
+    _pcm_frames_written = _pcm_run_frames = 0
+    return _pcm_proc
+
+
+def play_pcm(frames: bytes, rate: int, channels: int, sampwidth: int, wait: bool = True) -> None:
+    """
+    Write raw PCM frames to the persistent aplay process.
+
+    With wait=True, returns once the audio should have finished playing
+    (or as soon as stop_speaking() is called).
+    """
+    global _pcm_busy_until, _pcm_queued_until, _pcm_frames_written, _pcm_run_frames
+    n_frames = len(frames) // (channels * sampwidth)
+    duration = n_frames / float(rate)
+
+    with _pcm_lock:
+        for attempt in (1, 2):
+            proc = _pcm_pipe(rate, channels, sampwidth)
+            # Estimate before writing: a large write blocks while aplay plays it
+            now = time.monotonic()
+            if now >= _pcm_queued_until:
+                # Player went idle: it refills to the start threshold first
+                _pcm_run_frames = 0
+                start = now + APLAY_START_DELAY_US / 1_000_000
+            else:
+                start = _pcm_queued_until
+            try:
+                proc.stdin.write(frames)
+                proc.stdin.flush()
+                break
+            except (BrokenPipeError, ValueError):
+                if _stop_requested.is_set() or attempt == 2:
+                    return
+                print("[tts] aplay pipe closed; respawning player.")
+                _close_pcm_pipe()
+        _pcm_busy_until = _pcm_queued_until = start + duration
+        _pcm_frames_written += n_frames
+        _pcm_run_frames += n_frames
+
+    if wait:
+        _wait_for_pcm()
+
+
+def end_pcm_utterance() -> None:
+    """
+    Pad the player with silence so everything written so far plays.
+
+    aplay reads its stdin a whole period at a time and only starts the
+    device once its start threshold is buffered, and the persistent pipe
+    never sends EOF. Without this, the tail of a reply (or all of a short
+    clip) would sit in aplay until the next write.
+    """
+    global _pcm_queued_until, _pcm_frames_written, _pcm_run_frames
+    with _pcm_lock:
+        proc, fmt = _pcm_proc, _pcm_format
+        if proc is None or proc.poll() is not None or not _pcm_frames_written:
+            return
+        rate, channels, sampwidth = fmt
+        start_frames = int(rate * APLAY_START_DELAY_US / 1_000_000)
+        pad = max(0, start_frames - _pcm_run_frames)
+        pad += -(_pcm_frames_written + pad) % APLAY_PERIOD_FRAMES
+        if not pad:
+            return
+        silence = (b"\x80" if sampwidth == 1 else b"\0") * (pad * channels * sampwidth)
+        try:
+            proc.stdin.write(silence)
+            proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            return
+        _pcm_queued_until = max(time.monotonic(), _pcm_queued_until) + pad / float(rate)
+        _pcm_frames_written += pad
+        _pcm_run_frames += pad
+
+
+def _wait_for_pcm() -> None:
+    """Block until queued PCM should have finished playing, or a barge-in."""
+    _stop_requested.wait(max(0.0, _pcm_busy_until - time.monotonic()))
+
+
+@lru_cache(maxsize=32)
+def _load_wav(path: str, inode: int, size: int) -> Tuple[bytes, int, int, int]:
+    """
+    Parsed WAV, kept in memory. Keyed by inode/size so rewrites (always a
+    rename onto the path) reload, while cache hits touching mtime don't.
+    """
+    return _parse_wav(Path(path).read_bytes())
+
+
+def play_wav_file(path: Path, wait: bool = True, end_utterance: bool = True) -> None:
+    """
+    Play a WAV file through the persistent PCM player. Pass
+    end_utterance=False when more audio follows right away (see speak()).
+    """
+    try:
+        st = os.stat(path)
+        frames, rate, channels, sampwidth = _load_wav(str(path), st.st_ino, st.st_size)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[tts] Can't stream {path} as PCM ({e}); using aplay directly.")
+        _play_wav_with_aplay(Path(path))
+        return
+    if sampwidth not in _ALSA_SAMPLE_FORMATS:
+        _play_wav_with_aplay(Path(path))
+        return
+    play_pcm(frames, rate, channels, sampwidth, wait=False)
+    if end_utterance:
+        end_pcm_utterance()
+    if wait:
+        _wait_for_pcm()
+
+
+def _play_wav_with_aplay(path: Path) -> None:
     """Play a WAV file using aplay (or another command if you customize)."""
+    global _current_playback
     try:
         cmd = PLAYBACK_CMD + [str(path)]
-        subprocess.run(cmd, check=True)
+        with _playback_lock:
+            if _stop_requested.is_set():
+                return
+            proc = subprocess.Popen(cmd)
+            _current_playback = proc
+        returncode = proc.wait()
+        if returncode != 0 and not _stop_requested.is_set():
+            print(f"[tts] Playback failed: aplay exited with {returncode}")
     except Exception as e:
         print(f"[tts] Playback failed: {e}")
+    finally:
+        with _playback_lock:
+            _current_playback = None
+
+
+def _play_wav(path: Path, wait: bool = True) -> None:
+    if _stop_requested.is_set():
+        return
+    play_wav_file(path, wait=wait, end_utterance=False)
+
+
+def stop_speaking() -> None:
+    """
+    Barge-in: stop the reply that is playing right now.
+
+    Kills the running aplay (if any) and makes the in-flight speak() call
+    return without playing. Later speak() calls stay silent until
+    clear_barge_in() starts the next turn.
+    """
+    with _playback_lock:
+        _stop_requested.set()
+        if _current_playback is not None and _current_playback.poll() is None:
+            print("[tts] Stopping playback (barge-in).")
+            _current_playback.terminate()
+
+    # Killing the PCM player drops whatever it still had buffered; the next
+    # play_pcm() call respawns it. No lock here: a writer may be blocked on it.
+    global _pcm_busy_until, _pcm_queued_until
+    _pcm_busy_until = _pcm_queued_until = 0.0
+    proc = _pcm_proc
+    if proc is not None and proc.poll() is None:
+        print("[tts] Stopping PCM player (barge-in).")
+        proc.kill()
+
+
+def clear_barge_in() -> None:
+    """Start of a new turn: let speak() play again after a stop_speaking()."""
+    _stop_requested.clear()
+
+
+def barge_in_requested() -> bool:
+    """True if stop_speaking() was called since the last clear_barge_in()."""
+    return _stop_requested.is_set()
+
 
 def _openai_tts_to_wav(text: str, out_path: Path) -> bool:
     """
@@ -130,34 +424,196 @@ def _piper_tts_to_wav(text: str, out_path: Path) -> bool:
         return False
 
 
+def _cache_path(text: str) -> Path:
+    key = f"{OPENAI_TTS_MODEL}|{OPENAI_TTS_VOICE}|{text}".encode("utf-8")
+    return CACHE_DIR / f"{hashlib.sha256(key).hexdigest()}.wav"
+
+
+def _trim_cache() -> None:
+    """Keep only the TTS_CACHE_MAX_FILES newest cached WAVs (plus preloads)."""
+    try:
+        # Preloaded fixed lines are never evicted
+        pinned = {_cache_path(p.strip()).name for p in PRELOAD_PHRASES}
+        files = sorted(
+            (f for f in CACHE_DIR.glob("*.wav") if f.name not in pinned),
+            key=lambda f: f.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in files[TTS_CACHE_MAX_FILES:]:
+            stale.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"[tts] Cache trim failed: {e}")
+
+
+def _cache_tmp_path() -> Path:
+    """
+    A fresh temp file in the cache dir. Unique per writer, since preload and
+    speak() can cache the same phrase at once.
+    """
+    CACHE_DIR.mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix=".wav.tmp", delete=False) as tmp:
+        return Path(tmp.name)
+
+
+def _touch_cached(path: Path) -> None:
+    """Mark a cache entry as just used, so _trim_cache evicts least recently used."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _store_in_cache(data: bytes, path: Path) -> None:
+    """Write a complete WAV into the cache atomically, then trim it."""
+    try:
+        tmp_path = _cache_tmp_path()
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"[tts] Couldn't cache speech: {e}")
+        return
+    _trim_cache()
+
+
+def _stream_openai_tts(text: str, cache_path: Path, wait: bool = True) -> bool:
+    """
+    Stream OpenAI TTS into the PCM player as it downloads, so the first
+    words play while the rest is still being synthesized. The complete WAV
+    is then stored at `cache_path`. With wait=False, returns as soon as the
+    last chunk is queued instead of when it has finished playing.
+
+    Returns False only if no audio could be played, so the caller can try
+    another engine without repeating anything the user already heard.
+    """
+    if not os.environ.get("OPENAI_API_KEY"):
+        print("[tts] OPENAI_API_KEY not set; cannot use OpenAI TTS.")
+        return False
+
+    print(f"[tts] Streaming OpenAI TTS (model={OPENAI_TTS_MODEL}, voice={OPENAI_TTS_VOICE})...")
+    wav = bytearray()
+    fmt = None          # (rate, channels, sampwidth) once the header has arrived
+    pending = b""       # PCM not yet written (less than one whole frame)
+    try:
+        with client.audio.speech.with_streaming_response.create(
+            model=OPENAI_TTS_MODEL,
+            voice=OPENAI_TTS_VOICE,
+            input=text,
+            response_format="wav",
+        ) as response:
+            for chunk in response.iter_bytes(4096):
+                if _stop_requested.is_set():
+                    return True   # barge-in: drop the rest, don't cache a partial reply
+                wav += chunk
+                if fmt is None:
+                    try:
+                        pending, *header = _parse_wav(bytes(wav))
+                    except (ValueError, struct.error):
+                        continue  # header not complete yet
+                    if header[2] not in _ALSA_SAMPLE_FORMATS:
+                        raise ValueError(f"unsupported sample width {header[2]}")
+                    fmt = tuple(header)
+                else:
+                    pending += chunk
+
+                frame_bytes = fmt[1] * fmt[2]
+                usable = len(pending) - len(pending) % frame_bytes
+                if usable:
+                    play_pcm(pending[:usable], *fmt, wait=False)
+                    pending = pending[usable:]
+    except Exception as e:
+        print(f"[tts] OpenAI TTS stream failed: {e}")
+        if fmt is not None and wait:
+            _wait_for_pcm()
+        return fmt is not None
+
+    if fmt is None:
+        print("[tts] OpenAI TTS returned no playable audio.")
+        return False
+
+    _store_in_cache(bytes(wav), cache_path)
+    if wait:
+        _wait_for_pcm()
+    return True
+
+
+def _synthesize_to_cache(text: str, path: Path) -> bool:
+    """
+    OpenAI TTS straight into the cache. Written under a temp name and renamed,
+    so a failed or interrupted call never leaves a truncated cache entry.
+    """
+    try:
+        tmp_path = _cache_tmp_path()
+    except Exception as e:
+        print(f"[tts] Can't create a file in {CACHE_DIR}: {e}")
+        return False
+    if not _openai_tts_to_wav(text, tmp_path):
+        tmp_path.unlink(missing_ok=True)
+        return False
+    os.replace(tmp_path, path)
+    _trim_cache()
+    return True
+
+
 # ---------- PUBLIC API ----------
 
-def speak(text: str, max_chars: int = 500) -> None:
+def synthesize_to_wav(text: str, out_path: Path) -> bool:
     """
-    Convert `text` to speech and play it through the Pi's speakers.
+    Synthesize `text` into a WAV file at `out_path` without playing it
+    (OpenAI TTS, then Piper if enabled). Returns True on success.
+    """
+    return _openai_tts_to_wav(text, out_path) or _piper_tts_to_wav(text, out_path)
 
-    - Truncates very long text for TTS sanity.
-    - Tries OpenAI TTS first; if that fails and Piper is enabled, tries Piper.
+
+def preload_tts(phrases: Optional[Iterable[str]] = None) -> None:
     """
-    text = (text or "").strip()
-    if not text:
-        print("[tts] Empty text, nothing to speak.")
+    Synthesize any uncached phrases (default: PRELOAD_PHRASES) into the TTS
+    cache. Blocks until done; run it on a background thread at startup.
+    """
+    if not PRELOAD_ENABLED:
+        return
+    texts = {p.strip() for p in (PRELOAD_PHRASES if phrases is None else phrases)}
+    missing = [t for t in texts if t and not _cache_path(t).exists()]
+    if not missing:
         return
 
-    if len(text) > max_chars:
-        print(f"[tts] Truncating text from {len(text)} to {max_chars} chars for TTS.")
-        text = text[:max_chars]
+    print(f"[tts] Preloading {len(missing)} phrase(s)...")
+    with ThreadPoolExecutor(max_workers=min(4, len(missing))) as pool:
+        list(pool.map(lambda t: _synthesize_to_cache(t, _cache_path(t)), missing))
+
+
+def _split_sentences(text: str) -> list:
+    """Split text at sentence ends, keeping pieces of at least SENTENCE_MIN_CHARS."""
+    pieces = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        if pieces and len(pieces[-1]) < SENTENCE_MIN_CHARS:
+            pieces[-1] += " " + sentence
+        else:
+            pieces.append(sentence)
+    return pieces
 
-    # Temporary file for WAV output
+
+def _speak_one(text: str) -> None:
+    """
+    Queue one piece of speech on the PCM player without waiting for it to
+    finish, so the caller can synthesize the next piece meanwhile.
+    """
+    # 0) Said this exact line before? Play it from the cache.
+    cached = _cache_path(text)
+    if cached.exists():
+        print(f"[tts] Cache hit ({cached.name[:12]})")
+        _play_wav(cached, wait=False)
+        _touch_cached(cached)
+        return
+
+    # 1) Stream OpenAI TTS into the player (and the cache)
+    if _stream_openai_tts(text, cached, wait=False):
+        return
+
+    # 2) If OpenAI fails, optionally try Piper (not cached: different voice)
     with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
         out_path = Path(tmp.name)
 
-    # 1) Try OpenAI TTS
-    ok = _openai_tts_to_wav(text, out_path)
-
-    # 2) If OpenAI fails, optionally try Piper
-    if not ok:
-        ok = _piper_tts_to_wav(text, out_path)
+    ok = _piper_tts_to_wav(text, out_path)
 
     if not ok:
         print("[tts] All TTS methods failed; Cade will be silent for this reply.")
@@ -167,8 +623,8 @@ def speak(text: str, max_chars: int = 500) -> None:
             pass
         return
 
-    # 3) Play the WAV
-    _play_wav(out_path)
+    # 3) Play the Piper WAV (parsed into memory, so the file can go right away)
+    _play_wav(out_path, wait=False)
 
     # 4) Cleanup
     try:
@@ -177,9 +633,40 @@ def speak(text: str, max_chars: int = 500) -> None:
         pass
 
 
+def speak(text: str, max_chars: int = 500) -> None:
+    """
+    Convert `text` to speech and play it through the Pi's speakers.
+
+    - Truncates very long text for TTS sanity.
+    - Tries OpenAI TTS first; if that fails and Piper is enabled, tries Piper.
+    - Multi-sentence text is synthesized sentence by sentence: the persistent
+      player is the queue, so the next sentence downloads while this one plays.
+    """
+    text = (text or "").strip()
+    if not text:
+        print("[tts] Empty text, nothing to speak.")
+        return
+
+    if _stop_requested.is_set():
+        print("[tts] Barge-in this turn; not speaking.")
+        return
+
+    if len(text) > max_chars:
+        print(f"[tts] Truncating text from {len(text)} to {max_chars} chars for TTS.")
+        text = text[:max_chars]
+
+    for sentence in _split_sentences(text):
+        if _stop_requested.is_set():
+            return
+        _speak_one(sentence)
+
+    end_pcm_utterance()
+    _wait_for_pcm()
+
 if __name__ == "__main__":
     # Simple CLI test: python tts_backend.py "hello there"
     import sys
     test_text = " ".join(sys.argv[1:]) or "Hello, I am Cade."
+    preload_tts()
     speak(test_text)
 
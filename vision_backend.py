@@ -1,38 +1,87 @@
 # vision_backend.py
 
+import atexit
 import cv2
 import base64
+import threading
 import tempfile
 from pathlib import Path
-from openai import OpenAI
-
-client = OpenAI()  # uses OPENAI_API_KEY from env
+from openai_client import client  # shared keep-alive connection; uses OPENAI_API_KEY
 
 # Adjust if your webcam is not /dev/video0
 CAMERA_INDEX = 0
 
+# Plenty for a 1-2 sentence scene description, at about half the bytes
+JPEG_QUALITY = 70
+
+# Opened on first use and kept open: reopening the V4L2 device (and waiting
+# out its auto-exposure) on every call costs hundreds of ms on the Pi
+_cap = None
+_cap_index = None
+_cap_lock = threading.Lock()
+
+
+def _release_cap() -> None:
+    global _cap, _cap_index
+    if _cap is not None:
+        _cap.release()
+    _cap = None
+    _cap_index = None
+
+
+atexit.register(_release_cap)
+
+
+def _get_cap(device_index: int):
+    """Return the shared capture for `device_index`, opening it if needed (call with _cap_lock held)."""
+    global _cap, _cap_index
+    if _cap is not None and _cap_index == device_index and _cap.isOpened():
+        return _cap
+    _release_cap()
 
-def capture_frame(device_index: int = CAMERA_INDEX) -> Path:
-    """
-    Grab a single frame from the webcam and save it as a JPEG.
-    Returns the Path to the saved file.
-    """
     cap = cv2.VideoCapture(device_index)
     if not cap.isOpened():
+        cap.release()
         raise RuntimeError(f"Cannot open camera index {device_index}")
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # keep as little stale video queued as possible
+    _cap, _cap_index = cap, device_index
+    return cap
+
+
+def _grab_frame(device_index: int = CAMERA_INDEX):
+    """Return the newest frame from the webcam as a BGR array."""
+    with _cap_lock:
+        cap = _get_cap(device_index)
 
-    ret, frame = cap.read()
-    cap.release()
+        # Frames queued since the last call are stale; skip past them
+        for _ in range(2):
+            cap.grab()
+        ret, frame = cap.retrieve()
 
-    if not ret:
-        raise RuntimeError("Failed to grab frame from camera")
+        if not ret:
+            # Device may have gone away (unplugged webcam); reopen next time
+            _release_cap()
+            raise RuntimeError("Failed to grab frame from camera")
+    return frame
 
-    tmp = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
-    img_path = Path(tmp.name)
-    tmp.close()
 
-    cv2.imwrite(str(img_path), frame)
-    return img_path
+def _encode_jpeg(frame) -> bytes:
+    """JPEG-encode a frame in memory."""
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("Failed to encode frame as JPEG")
+    return buf.tobytes()
+
+
+def capture_frame(device_index: int = CAMERA_INDEX) -> Path:
+    """
+    Grab a single frame from the webcam and save it as a JPEG.
+    Returns the Path to the saved file.
+    """
+    jpeg = _encode_jpeg(_grab_frame(device_index))
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
+        tmp.write(jpeg)
+    return Path(tmp.name)
 
 
 def describe_scene(device_index: int = CAMERA_INDEX) -> str:
@@ -40,10 +89,9 @@ def describe_scene(device_index: int = CAMERA_INDEX) -> str:
     Capture a frame from the camera and ask a vision-capable model
     to describe it in 12 sentences.
     """
-    img_path = capture_frame(device_index)
-
-    with open(img_path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode("utf-8")
+    # Encoded in memory: no temp file written just to be read back
+    jpeg = _encode_jpeg(_grab_frame(device_index))
+    b64 = base64.b64encode(jpeg).decode("ascii")
 
     resp = client.chat.completions.create(
         model="gpt-4.1-mini",  # or any vision-capable model you like
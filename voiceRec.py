@@ -1,24 +1,18 @@
 import time
 import numpy as np
 import sounddevice as sd
-from faster_whisper import WhisperModel
+from whisper_singleton import MODEL as model
 
 # ---------- CONFIG ----------
 SAMPLE_RATE = 16000
 CHANNELS = 1
 DEFAULT_DURATION = 5.0  # seconds to record when called
-MODEL_NAME = "tiny.en"  # or "base.en" if the Pi can handle it
 
 # If your webcam mic isn't the default, set this:
 # Find device index with: python -c "import sounddevice as sd; print(sd.query_devices())"
 INPUT_DEVICE_INDEX = None  # e.g. 2
 # ----------------------------
 
-# Initialize the model once at import so other modules can reuse it.
-print("[voice_recognizer] Loading Whisper model...")
-model = WhisperModel(MODEL_NAME, device="cpu", compute_type="int8")
-print("[voice_recognizer] Model loaded.")
-
 
 def _record_audio(duration: float = DEFAULT_DURATION) -> np.ndarray:
     """Record audio from the default (or specified) input device."""
@@ -57,8 +51,14 @@ def _transcribe_audio(audio: np.ndarray) -> str:
         beam_size=1,      # keep it light for Pi
         language="en",    # force English; set None for auto
         vad_filter=True,  # helps cut silence
+        without_timestamps=True,           # no timestamp tokens to decode
+        condition_on_previous_text=False,  # one short clip; no carry-over
     )
 
+    # segments is a lazy generator: decoding happens while iterating it,
+    # so consume it exactly once
+    segments = list(segments)
+
     dt = time.time() - t0
     print(
         f"[whisper] Done in {dt:.2f}s. "
@@ -1,38 +1,74 @@
 # voice_recognizer.py
 
+import asyncio
+import math
 import time
+import threading
+from collections import deque
+from typing import Callable, Optional
+
 import numpy as np
 import sounddevice as sd
-from faster_whisper import WhisperModel
+from whisper_singleton import MODEL as model
 import contextlib
 import os
+from math import gcd
+
+try:
+    from scipy.signal import resample_poly  # optional: proper anti-aliased resampling
+except ImportError:
+    resample_poly = None
 
 # ---------- CONFIG ----------
 SAMPLE_RATE = 16000
 CHANNELS = 1
 
-MODEL_NAME = "tiny.en"  # or "base.en" etc. if Pi 5 can handle it
-
 # Audio device; set to an index from sd.query_devices() if needed
 INPUT_DEVICE_INDEX = 0  # e.g. 2
 
 # VAD-ish settings
 BLOCK_DURATION = 0.2       # seconds per audio chunk
-SILENCE_THRESHOLD = 0.008   # RMS below this = "silence"
+SILENCE_THRESHOLD = 0.008   # RMS floor for the speech start/stop levels below
 MIN_SPEECH_DURATION = 0.5  # must have at least this much voiced audio
 TRAILING_SILENCE = 0.5     # stop after this much silence *after* speech
 MAX_RECORD_TIME = 15.0     # safety upper bound in seconds
+BARGE_IN_THRESHOLD = 0.05  # RMS needed to start recording while Cade is talking
+
+# Energy VAD: speech starts when a moving average (EMA) of block energy
+# clears VAD_START_FACTOR x the room's noise floor, and counts as silence
+# once a block drops under VAD_STOP_FACTOR x. The gap between the two keeps
+# soft syllables from ending a take; the EMA keeps single clicks from
+# starting one. The floor is the quietest block of the first NOISE_LEARN_TIME
+# after startup, then follows quiet pre-speech blocks on every listen.
+VAD_EMA_ALPHA = 0.5        # weight of the newest block in the EMA
+VAD_START_FACTOR = 3.0
+VAD_STOP_FACTOR = 1.5
+NOISE_LEARN_TIME = 0.5     # seconds
+NOISE_ADAPT_RATE = 0.05    # per quiet block, once learned
+PREROLL_BLOCKS = 2         # pre-speech blocks kept, so the EMA's lag doesn't clip the onset
+
+# Per-block / per-segment diagnostics; stdout writes in the capture path can
+# themselves cause input overflows on a slow console
+DEBUG = os.environ.get("CADE_DEBUG") == "1"
 # ----------------------------
 
-print("[voice_recognizer] Loading Whisper model...")
-model = WhisperModel(MODEL_NAME, device="cpu", compute_type="int8")
-print("[voice_recognizer] Model loaded.")
+# Room noise floor (mean-square energy) kept across listens; None until learned
+_noise_floor: Optional[float] = None
+
+
+def _vad_levels(noise_floor: float) -> tuple[float, float]:
+    """(start, stop) energy levels for a noise floor, never below SILENCE_THRESHOLD."""
+    min_level = SILENCE_THRESHOLD ** 2
+    return (max(VAD_START_FACTOR * noise_floor, min_level),
+            max(VAD_STOP_FACTOR * noise_floor, min_level))
+
 
-def _open_input_stream_for_device(dev_index: int):
+def _open_input_stream_for_device(dev_index: int, callback=None):
     """
     Try to open an InputStream on the given device with a handful
     of candidate sample rates and channel counts. Returns
     (stream, device_sr, channels) on success, or (None, None, None) on failure.
+    `callback` is passed through to sd.InputStream (callback mode).
     """
     # Common sane rates to try. Adjust or reorder if needed.
     candidate_rates = [48000, 16000, 44100]
@@ -51,6 +87,7 @@ def _open_input_stream_for_device(dev_index: int):
                         channels=ch,
                         dtype="float32",
                         blocksize=block_size,
+                        callback=callback,
                     )
                 print(f"[record] Opened input device {dev_index} @ {sr} Hz, {ch}ch")
                 return stream, sr, ch
@@ -79,11 +116,18 @@ def _get_input_device_and_rate():
 
 
 def _resample_to_16k(audio: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RATE) -> np.ndarray:
-    """Very simple linear resample using numpy (no SciPy needed)."""
+    """
+    Resample to target_sr. With SciPy this is a polyphase filter (low-pass and
+    decimation in one pass; 48 kHz -> 16 kHz is just up=1, down=3), otherwise
+    a simple linear interpolation.
+    """
     if audio.size == 0 or orig_sr == target_sr:
         return audio
 
-    import numpy as np
+    if resample_poly is not None:
+        g = gcd(orig_sr, target_sr)
+        return resample_poly(audio, target_sr // g, orig_sr // g).astype(np.float32, copy=False)
+
     duration = len(audio) / orig_sr
     new_len = int(round(duration * target_sr))
     if new_len <= 0:
@@ -95,23 +139,68 @@ def _resample_to_16k(audio: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RA
     return resampled
     
 
-def _record_until_silence() -> np.ndarray:
+def _record_until_silence(
+    speaking: Optional[threading.Event] = None,
+    on_barge_in: Optional[Callable[[], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> np.ndarray:
+    """Blocking wrapper around _record_until_silence_async (own event loop)."""
+    return asyncio.run(_record_until_silence_async(speaking, on_barge_in, stop))
+
+
+async def _record_until_silence_async(
+    speaking: Optional[threading.Event] = None,
+    on_barge_in: Optional[Callable[[], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> np.ndarray:
     """
     Listen on the mic and automatically:
-    - start when sound passes SILENCE_THRESHOLD
-    - stop after TRAILING_SILENCE seconds of low input
-    - or after MAX_RECORD_TIME
+    - start when the smoothed level clears the learned start level
+      (BARGE_IN_THRESHOLD while `speaking` is set, so Cade's own voice
+      doesn't trigger it; `on_barge_in` is called if the user talks over it)
+    - stop after TRAILING_SILENCE seconds below the stop level
+    - or after MAX_RECORD_TIME (counted from when Cade stops talking)
+    - or as soon as `stop` is set, discarding whatever was captured
     Returns: mono float32 numpy array at SAMPLE_RATE (16 kHz) for Whisper.
+
+    Audio is captured in sounddevice callback mode: PortAudio's thread hands
+    each block to this coroutine through an asyncio.Queue, so capture never
+    waits on the level/VAD logic below.
     """
     dev_index = INPUT_DEVICE_INDEX if INPUT_DEVICE_INDEX is not None else sd.default.device[0]
 
-    stream, device_sr, actual_channels = _open_input_stream_for_device(dev_index)
+    loop = asyncio.get_running_loop()
+    blocks: asyncio.Queue = asyncio.Queue()
+
+    def on_audio(indata, frames, time_info, status):
+        # PortAudio thread: copy (indata is reused) and hand off, nothing else
+        loop.call_soon_threadsafe(blocks.put_nowait, (indata.copy(), bool(status.input_overflow)))
+
+    stream, device_sr, actual_channels = _open_input_stream_for_device(dev_index, callback=on_audio)
     if stream is None:
         # Could not open the device at any sane rate; bail for this cycle
         return np.zeros(0, dtype="float32")
 
     block_size = int(device_sr * BLOCK_DURATION)
-    chunks = []
+
+    # Mono capture buffer, allocated once; a block is downmixed straight into
+    # buf[write_idx:] and only kept (write_idx advanced) once speech started.
+    # Until then the last PREROLL_BLOCKS are copied aside and put back in
+    # front of the block that starts the take.
+    buf = np.empty(int(MAX_RECORD_TIME * device_sr) + (PREROLL_BLOCKS + 1) * block_size,
+                   dtype=np.float32)
+    write_idx = 0
+    preroll = deque(maxlen=PREROLL_BLOCKS)
+
+    # Levels are mean-square energies (RMS squared), so no sqrt per block
+    global _noise_floor
+    noise_floor = _noise_floor
+    start_level, stop_level = _vad_levels(noise_floor or 0.0)
+    barge_in_level = BARGE_IN_THRESHOLD ** 2
+    noise_blocks_needed = max(1, math.ceil(NOISE_LEARN_TIME / BLOCK_DURATION))
+    noise_min = math.inf
+    noise_blocks = 0
+    ema = noise_floor or 0.0
 
     speech_started = False
     start_time = time.time()
@@ -119,69 +208,126 @@ def _record_until_silence() -> np.ndarray:
 
     print("\n[record] Waiting for speech...")
 
-    def rms(x: np.ndarray) -> float:
-        return float(np.sqrt(np.mean(x ** 2))) if x.size > 0 else 0.0
-
     try:
         with stream:
             while True:
+                if stop is not None and stop.is_set():
+                    print("[record] Listening cancelled.")
+                    return np.zeros(0, dtype="float32")
+
                 if time.time() - start_time > MAX_RECORD_TIME:
                     print("[record] Hit MAX_RECORD_TIME, stopping.")
                     break
 
-                block, overflowed = stream.read(block_size)
-                if overflowed:
+                try:
+                    block, overflowed = await asyncio.wait_for(blocks.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue  # stalled device; re-check MAX_RECORD_TIME
+                if overflowed and DEBUG:
                     print("[record] Warning: buffer overflowed.")
 
+                n = len(block)
+                if write_idx + n > buf.size:
+                    print("[record] Capture buffer full, stopping.")
+                    break
+
                 # Downmix to mono if needed
-                mono = block.mean(axis=1) if block.ndim > 1 else block.flatten()
-                level = rms(mono)
+                mono = buf[write_idx:write_idx + n]
+                if block.ndim > 1 and block.shape[1] > 1:
+                    np.mean(block, axis=1, out=mono)
+                else:
+                    mono[:] = block.reshape(-1)
+                energy = float(mono @ mono) / n if n else 0.0
+                ema += VAD_EMA_ALPHA * (energy - ema)
 
                 if not speech_started:
-                    if level > SILENCE_THRESHOLD:
+                    cade_talking = speaking is not None and speaking.is_set()
+                    if cade_talking:
+                        start_time = time.time()
+                        preroll.clear()   # don't hand Cade's own voice to Whisper
+                    elif noise_floor is None:
+                        # First listen: measure the room before looking for speech.
+                        # The quietest block, in case someone is already talking.
+                        noise_min = min(noise_min, energy)
+                        noise_blocks += 1
+                        if noise_blocks < noise_blocks_needed:
+                            preroll.append(mono.copy())
+                            continue
+                        noise_floor = _noise_floor = noise_min
+                        start_level, stop_level = _vad_levels(noise_floor)
+                        ema = noise_floor
+                        if DEBUG:
+                            print(f"[record] Noise floor RMS {math.sqrt(noise_floor):.4f}")
+                        preroll.append(mono.copy())
+                        continue
+                    elif energy < start_level:
+                        # Quiet block (not Cade's own voice): follow the room
+                        noise_floor += NOISE_ADAPT_RATE * (energy - noise_floor)
+                        _noise_floor = noise_floor
+                        start_level, stop_level = _vad_levels(noise_floor)
+                    if ema > (barge_in_level if cade_talking else start_level):
                         speech_started = True
                         last_voice_time = time.time()
-                        print("[record] Speech detected, recording...")
-                        chunks.append(mono)
+                        if cade_talking:
+                            if DEBUG:
+                                print("[record] Barge-in detected, recording...")
+                            if on_barge_in is not None:
+                                on_barge_in()
+                        elif DEBUG:
+                            print("[record] Speech detected, recording...")
+                        if preroll:
+                            current = mono.copy()
+                            for pre in preroll:
+                                buf[write_idx:write_idx + len(pre)] = pre
+                                write_idx += len(pre)
+                            buf[write_idx:write_idx + n] = current
+                            preroll.clear()
+                        write_idx += n
+                    else:
+                        preroll.append(mono.copy())
                 else:
-                    chunks.append(mono)
+                    write_idx += n
 
-                    if level > SILENCE_THRESHOLD:
+                    if energy > stop_level:
                         last_voice_time = time.time()
                     else:
                         if last_voice_time is not None:
                             silence_time = time.time() - last_voice_time
                             if silence_time >= TRAILING_SILENCE:
-                                print(
-                                    f"[record] Trailing silence ({silence_time:.2f}s) reached, stopping."
-                                )
+                                if DEBUG:
+                                    print(
+                                        f"[record] Trailing silence ({silence_time:.2f}s) reached, stopping."
+                                    )
                                 break
 
     except sd.PortAudioError as e:
         print(f"[record] PortAudioError during recording: {e}")
         return np.zeros(0, dtype="float32")
 
-    if not chunks:
+    if write_idx == 0:
         print("[record] No speech captured.")
         return np.zeros(0, dtype="float32")
 
-    audio = np.concatenate(chunks)
+    audio = buf[:write_idx]
     duration = len(audio) / device_sr
-    print(f"[record] Captured {duration:.2f}s of audio at {device_sr} Hz.")
+    if DEBUG:
+        print(f"[record] Captured {duration:.2f}s of audio at {device_sr} Hz.")
 
     if duration < MIN_SPEECH_DURATION:
         print("[record] Too short to be real speech, discarding.")
         return np.zeros(0, dtype="float32")
 
-    overall_rms = float(np.sqrt(np.mean(audio ** 2)))
-    peak = float(np.max(np.abs(audio)))
-    print(f"[record] RMS: {overall_rms:.4f}, Peak: {peak:.4f}")
+    peak = max(float(audio.max()), -float(audio.min()))
+    if DEBUG:
+        overall_rms = math.sqrt(float(audio @ audio) / audio.size)
+        print(f"[record] RMS: {overall_rms:.4f}, Peak: {peak:.4f}")
     if peak < 0.01:
         print("[record] Warning: input level looks very low.")
 
     # Resample to 16 kHz for Whisper
     audio_16k = _resample_to_16k(audio, device_sr, SAMPLE_RATE)
-    return audio_16k
+    # faster-whisper wants contiguous float32; this is a no-op when it already is
+    return np.ascontiguousarray(audio_16k, dtype=np.float32)
 
 
 
@@ -197,7 +343,9 @@ def _transcribe_audio(audio: np.ndarray) -> str:
         audio,
         beam_size=1,
         language="en",
-        vad_filter=True,
+        vad_filter=False,                  # already trimmed by our energy VAD
+        without_timestamps=True,           # no timestamp tokens to decode
+        condition_on_previous_text=False,  # one short utterance; no carry-over
         initial_prompt=(
         "The robot's name is k4d3, known as k4 or Cade. "
         "The user will often say the word 'Cade' or 'k4' clearly. "
@@ -207,6 +355,10 @@ def _transcribe_audio(audio: np.ndarray) -> str:
 )
 
 
+    # segments is a lazy generator: decoding happens while iterating it,
+    # so consume it exactly once
+    segments = list(segments)
+
     dt = time.time() - t0
     print(
         f"[whisper] Done in {dt:.2f}s. "
@@ -217,7 +369,7 @@ def _transcribe_audio(audio: np.ndarray) -> str:
 
     if not text:
         print("[whisper] No speech detected by model.")
-    else:
+    elif DEBUG:
         print("[whisper] Segments:")
         for seg in segments:
             print(
@@ -228,13 +380,20 @@ def _transcribe_audio(audio: np.ndarray) -> str:
     return text
 
 
-def listen_and_transcribe_auto() -> str:
+def listen_and_transcribe_auto(
+    speaking: Optional[threading.Event] = None,
+    on_barge_in: Optional[Callable[[], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> str:
     """
     - waits for you to start talking
     - stops after you pause
     - returns transcription string
+
+    Pass `speaking`/`on_barge_in` to start listening while Cade is still
+    talking, and `stop` to abandon the listen early (see _record_until_silence).
     """
-    audio = _record_until_silence()
+    audio = _record_until_silence(speaking, on_barge_in, stop)
     if audio.size == 0:
         print("[result] Nothing to transcribe.")
         return ""
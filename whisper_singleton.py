@@ -0,0 +1,23 @@
+# whisper_singleton.py
+#
+# The one faster-whisper model shared by voice_recognizer and voiceRec, so
+# importing both doesn't load (and hold) it twice.
+
+import os
+
+from faster_whisper import WhisperModel
+
+# ---------- CONFIG ----------
+MODEL_NAME = "tiny.en"  # or "base.en" etc. if Pi 5 can handle it
+CPU_THREADS = os.cpu_count() or 4  # all cores for CTranslate2's int8 kernels
+# ----------------------------
+
+print("[whisper] Loading Whisper model...")
+MODEL = WhisperModel(
+    MODEL_NAME,
+    device="cpu",
+    compute_type="int8",
+    cpu_threads=CPU_THREADS,
+    num_workers=1,  # one utterance at a time
+)
+print("[whisper] Model loaded.")